@@ -0,0 +1,136 @@
+# benchmarks/startup.py
+# GUI startup benchmark. Each run is a fresh interpreter, so nothing is already imported:
+#   - import: `python -X importtime -c "import main_gui"`, total plus the slowest modules
+#   - window: importing main_gui, building the window and its first page, one update() (needs a display)
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --save benchmarks/startup.json --budget 80
+#   python -m benchmarks.startup --compare benchmarks/startup.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import tkinter
+import main_gui
+try:
+    app = main_gui.SecureMessengerApp()
+except tkinter.TclError as e:
+    raise SystemExit(f"no display: {e}")
+app.update()
+print(time.perf_counter() - start)
+app.destroy()
+"""
+
+def _python(args: list) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+def parse_importtime(stderr: str) -> list:
+    """(name, self_us, cumulative_us, depth) per line of -X importtime output, in output order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def measure_import(module: str):
+    """Seconds to import module in a fresh interpreter, and its rows from -X importtime."""
+    proc = _python(["-X", "importtime", "-c", f"import {module}"])
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = parse_importtime(proc.stderr)
+    total = next(cumulative for name, _, cumulative, depth in reversed(rows) if name == module)
+    return total / 1e6, rows
+
+def measure_window() -> float:
+    proc = _python(["-c", WINDOW_SCRIPT])
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "window failed")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def _summary(times: list) -> dict:
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs": times}
+
+def _slowest(rows: list, module: str, top: int) -> list:
+    """Modules pulled in by module with the largest self time (the ones worth deferring)."""
+    rows = [row for row in rows if row[0] != module]
+    return [{"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[1])[:top]]
+
+def main(argv=None) -> int:
+    from .suite import compare
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Measure GUI import time and time to first window.")
+    parser.add_argument("--module", default="main_gui", help="module whose import is timed")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imported modules to list")
+    parser.add_argument("--no-window", action="store_true", help="skip the time-to-first-window measurement")
+    parser.add_argument("--budget", type=float, help="fail if the median import time exceeds this many ms")
+    parser.add_argument("--save", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    import_name = f"startup.import[{args.module}]"
+    try:
+        measure_import(args.module)  # warm-up: writes .pyc files so every timed run is alike
+        timed = [measure_import(args.module) for _ in range(args.repeat)]
+        results[import_name] = dict(_summary([seconds for seconds, _ in timed]),
+                                    slowest=_slowest(timed[-1][1], args.module, args.top))
+    except RuntimeError as e:
+        results[import_name] = {"error": str(e)}
+    if not args.no_window:
+        try:
+            results["startup.window"] = _summary([measure_window() for _ in range(args.repeat)])
+        except RuntimeError as e:
+            results["startup.window"] = {"error": str(e)}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:32s} ERROR {result['error']}")
+            continue
+        line = f"{name:32s} {result['median_s'] * 1000:8.1f} ms (min {result['min_s'] * 1000:.1f} ms)"
+        base = (baseline or {}).get(name)
+        if base and "median_s" in base:
+            line += f"  ({result['median_s'] / base['median_s']:.2f}x baseline)"
+        print(line)
+        for row in result.get("slowest", []):
+            print(f"    {row['module']:36s} self {row['self_ms']:7.1f} ms   cumulative {row['cumulative_ms']:7.1f} ms")
+
+    if args.save:
+        meta = {"python": platform.python_version(), "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    if regressions:
+        print(f"Regressions over {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+    over_budget = False
+    if args.budget is not None and "median_s" in results[import_name]:
+        over_budget = results[import_name]["median_s"] * 1000 > args.budget
+        if over_budget:
+            print(f"Import of {args.module} exceeds the {args.budget:.0f} ms budget.", file=sys.stderr)
+    return 1 if "error" in results[import_name] or regressions or over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
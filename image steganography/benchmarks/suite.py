@@ -0,0 +1,340 @@
+# benchmarks/suite.py
+# Headless benchmarks for the steg and FSK engines (no Tk needed). Every case runs in a fresh
+# process, so its peak RSS is its own; inputs are synthesised once (seeded) and reused.
+#
+#   python -m benchmarks --preset quick
+#   python -m benchmarks --save benchmarks/baseline.json
+#   python -m benchmarks --compare benchmarks/baseline.json --filter steg.decode
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from dataclasses import dataclass, field
+
+import numpy as np
+from PIL import Image
+
+from steg_tab.output_formats import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS
+from steg_tab.steg_crypto import capacity_bits, decode_secret_payload, embed_secret_message
+from sstv_tab.fsk import PROFILES, decode_wav_parallel, decode_wav_to_file, encode_file_to_wav
+from sstv_tab.framing import FRAME_PAYLOAD, MAX_FRAME_BYTES
+
+COVERS = {"0.3MP": (640, 480), "2MP": (1600, 1200), "12MP": (4000, 3000), "50MP": (8192, 6144)}
+PAYLOADS = {"10B": 10, "1KB": 1024, "64KB": 64 * 1024, "capacity": None}
+RECIPIENT = "bench@example.com"
+SEED = 1234
+
+PRESETS = {
+    "quick": {
+        "covers": ["0.3MP", "2MP"], "payloads": ["10B", "1KB", "capacity"], "format_covers": ["2MP"],
+        "audio": [("bfsk", 5), ("bfsk", 60), ("16fsk", 5)],
+    },
+    "full": {
+        "covers": list(COVERS), "payloads": list(PAYLOADS), "format_covers": ["2MP", "12MP"],
+        "audio": [("bfsk", 5), ("bfsk", 60), ("bfsk", 600), ("bfsk", 3600),
+                  ("16fsk", 5), ("16fsk", 60), ("16fsk", 600), ("16fsk-fast", 60)],
+    },
+}
+FORMAT_PAYLOAD = "1KB"  # payload for the per-output-format embed cases
+PARALLEL_MIN_SECONDS = 600  # decode_wav_parallel only splits long recordings
+WARMUP_UNDER = 1.0  # cases faster than this get an untimed warm-up run first
+
+@dataclass
+class Case:
+    group: str  # steg.embed, steg.decode, fsk.encode, fsk.decode, fsk.decode_parallel
+    label: str
+    inputs: dict = field(default_factory=dict)
+    units: dict = field(default_factory=dict)  # pixels / bits / audio_seconds per run
+
+    @property
+    def name(self) -> str:
+        return f"{self.group}[{self.label}]"
+
+# ---------------------------------------------------------------- synthetic inputs
+
+def _message(n: int) -> str:
+    rng = np.random.default_rng(SEED + n)
+    return rng.integers(ord("a"), ord("z") + 1, n, dtype=np.uint8).tobytes().decode("ascii")
+
+def _varint_len(n: int) -> int:
+    return max(1, math.ceil(n.bit_length() / 7))
+
+def _capacity_message_len(num_pixels: int) -> int:
+    """Longest uncompressed message that still fits at 1 LSB in R,G,B."""
+    available = capacity_bits(num_pixels) // 8 - 4
+    fixed = 2 + _varint_len(len(RECIPIENT)) + len(RECIPIENT)
+    n = available - fixed
+    while fixed + _varint_len(n) + n > available:
+        n -= 1
+    return n
+
+def _cover(work_dir: str, label: str) -> str:
+    path = os.path.join(work_dir, f"cover-{label}.png")
+    if not os.path.exists(path):
+        width, height = COVERS[label]
+        rng = np.random.default_rng(SEED)
+        gradient = np.add.outer(np.linspace(0, 120, height), np.linspace(0, 120, width)).astype(np.uint8)
+        pixels = np.repeat(gradient[:, :, None], 3, axis=2)
+        pixels += rng.integers(0, 16, pixels.shape, dtype=np.uint8)  # keeps the file realistically large
+        Image.fromarray(pixels, "RGB").save(path, compress_level=1)
+    return path
+
+def _stego(work_dir: str, cover: str, label: str, message: str, compress: bool) -> str:
+    path = os.path.join(work_dir, f"stego-{label}.png")
+    if not os.path.exists(path):
+        embed_secret_message(cover, path, message, RECIPIENT, compress=compress)
+    return path
+
+def _audio_input(work_dir: str, profile: str, seconds: int) -> str:
+    """Random data sized so that its framed encoding lasts about `seconds`."""
+    path = os.path.join(work_dir, f"data-{profile}-{seconds}s.bin")
+    if not os.path.exists(path):
+        size = int(seconds * PROFILES[profile].bit_rate / 8 * FRAME_PAYLOAD / MAX_FRAME_BYTES)
+        with open(path, "wb") as f:
+            f.write(np.random.default_rng(SEED + seconds).bytes(size))
+    return path
+
+def _wav(work_dir: str, data: str, profile: str, seconds: int) -> str:
+    path = os.path.join(work_dir, f"audio-{profile}-{seconds}s.wav")
+    if not os.path.exists(path):
+        encode_file_to_wav(data, path, profile)
+    return path
+
+def build_cases(preset: str, work_dir: str, name_filter: str = None) -> list:
+    """Case list for a preset; inputs are created (or reused from work_dir) as needed."""
+    spec = PRESETS[preset]
+    wanted = (lambda name: name_filter in name) if name_filter else (lambda name: True)
+    cases = []
+    for cover_label in spec["covers"]:
+        width, height = COVERS[cover_label]
+        pixels = width * height
+        for payload_label in spec["payloads"]:
+            size = PAYLOADS[payload_label] or _capacity_message_len(pixels)
+            if size > _capacity_message_len(pixels):
+                continue
+            label = f"{cover_label}-{payload_label}"
+            compress = payload_label != "capacity"  # fill the image exactly
+            units = {"pixels": pixels, "bits": size * 8}
+            if wanted(f"steg.embed[{label}]"):
+                cases.append(Case("steg.embed", label, {"cover": _cover(work_dir, cover_label), "size": size,
+                                                        "compress": compress}, units))
+            if wanted(f"steg.decode[{label}]"):
+                stego = _stego(work_dir, _cover(work_dir, cover_label), label, _message(size), compress)
+                cases.append(Case("steg.decode", label, {"stego": stego}, units))
+
+    # the default format is already covered above
+    formats = [name for name in OUTPUT_FORMATS if name != DEFAULT_OUTPUT_FORMAT]
+    for cover_label in spec["format_covers"]:
+        width, height = COVERS[cover_label]
+        size = PAYLOADS[FORMAT_PAYLOAD]
+        for output_format in formats:
+            label = f"{cover_label}-{FORMAT_PAYLOAD}-{output_format}"
+            if wanted(f"steg.embed[{label}]"):
+                cases.append(Case("steg.embed", label, {"cover": _cover(work_dir, cover_label), "size": size,
+                                                        "compress": True, "output_format": output_format},
+                                  {"pixels": width * height, "bits": size * 8}))
+
+    for profile, seconds in spec["audio"]:
+        label = f"{profile}-{seconds}s"
+        groups = ["fsk.encode", "fsk.decode"] + (["fsk.decode_parallel"] if seconds >= PARALLEL_MIN_SECONDS else [])
+        groups = [g for g in groups if wanted(f"{g}[{label}]")]
+        if not groups:
+            continue
+        data = _audio_input(work_dir, profile, seconds)
+        wav_path = _wav(work_dir, data, profile, seconds)
+        with wave.open(wav_path, "r") as wf:
+            audio_seconds = wf.getnframes() / wf.getframerate()
+        units = {"bits": os.path.getsize(data) * 8, "audio_seconds": audio_seconds}
+        for group in groups:
+            cases.append(Case(group, label, {"data": data, "wav": wav_path, "profile": profile}, units))
+    return cases
+
+# ---------------------------------------------------------------- runners (child process)
+
+def _run_embed(inputs: dict, out_dir: str) -> None:
+    output_format = OUTPUT_FORMATS[inputs.get("output_format", DEFAULT_OUTPUT_FORMAT)]
+    out = os.path.join(out_dir, "embed" + output_format.extension)
+    embed_secret_message(inputs["cover"], out, inputs["message"], RECIPIENT, compress=inputs["compress"],
+                         output_format=output_format.name)
+
+def _run_decode(inputs: dict, out_dir: str) -> None:
+    decode_secret_payload(inputs["stego"])
+
+def _run_fsk_encode(inputs: dict, out_dir: str) -> None:
+    encode_file_to_wav(inputs["data"], os.path.join(out_dir, "encode.wav"), inputs["profile"])
+
+def _run_fsk_decode(inputs: dict, out_dir: str) -> None:
+    decode_wav_to_file(inputs["wav"], os.path.join(out_dir, "decode.bin"))
+
+def _run_fsk_decode_parallel(inputs: dict, out_dir: str) -> None:
+    decode_wav_parallel(inputs["wav"], os.path.join(out_dir, "decode.bin"))
+
+RUNNERS = {
+    "steg.embed": _run_embed,
+    "steg.decode": _run_decode,
+    "fsk.encode": _run_fsk_encode,
+    "fsk.decode": _run_fsk_decode,
+    "fsk.decode_parallel": _run_fsk_decode_parallel,
+}
+
+def _peak_rss() -> int:
+    """
+    Peak resident set size of this process in bytes, if the platform reports it. Worker
+    processes (decode_wav_parallel) are not included.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:  # Linux: resets on exec, unlike ru_maxrss
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset  # Windows
+    except (ImportError, AttributeError):
+        return None
+
+def _child(group: str, inputs: dict, repeat: int, out_dir: str, results) -> None:
+    try:
+        if "size" in inputs:
+            inputs = dict(inputs, message=_message(inputs["size"]))
+        runner = RUNNERS[group]
+
+        def timed():
+            start = time.perf_counter()
+            runner(inputs, out_dir)
+            return time.perf_counter() - start
+
+        first = timed()
+        times = [] if first < WARMUP_UNDER else [first]  # short cases: first run only pays one-off setup
+        while len(times) < repeat:
+            times.append(timed())
+        results.put({"times": times, "peak_rss": _peak_rss()})
+    except BaseException as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+def run_case(case: Case, repeat: int, out_dir: str) -> dict:
+    """Run a case `repeat` times in a fresh spawned process; returns timing, throughput and RSS."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(case.group, case.inputs, repeat, out_dir, results))
+    proc.start()
+    outcome = results.get()
+    proc.join()
+    if "error" in outcome:
+        return {"error": outcome["error"]}
+    median = statistics.median(outcome["times"])
+    result = {"median_s": median, "min_s": min(outcome["times"]), "runs": len(outcome["times"]),
+              "peak_rss_mb": outcome["peak_rss"] / 2**20 if outcome["peak_rss"] else None}
+    if "pixels" in case.units:
+        result["pixels_per_s"] = case.units["pixels"] / median
+    result["bits_per_s"] = case.units["bits"] / median
+    if "audio_seconds" in case.units:
+        result["audio_x_realtime"] = case.units["audio_seconds"] / median
+    return result
+
+# ---------------------------------------------------------------- reporting
+
+def _format_throughput(result: dict) -> str:
+    parts = []
+    if "pixels_per_s" in result:
+        parts.append(f"{result['pixels_per_s'] / 1e6:8.1f} Mpx/s")
+    parts.append(f"{result['bits_per_s'] / 1e6:8.2f} Mbit/s")
+    if "audio_x_realtime" in result:
+        parts.append(f"{result['audio_x_realtime']:8.0f}x realtime")
+    return "  ".join(parts)
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Names of cases whose median time or peak RSS grew by more than tolerance over baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or "error" in base:
+            continue
+        slower = result["median_s"] > base["median_s"] * (1 + tolerance)
+        bigger = (result.get("peak_rss_mb") and base.get("peak_rss_mb")
+                  and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance))
+        if slower or bigger:
+            regressions.append(name)
+    return regressions
+
+def _metadata() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pillow": Image.__version__, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark steg embed/decode and FSK encode/decode.")
+    parser.add_argument("--preset", choices=list(PRESETS), default="full")
+    parser.add_argument("--filter", help="only cases whose name contains this text, e.g. steg.decode or 12MP")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "steg-bench"),
+                        help="where synthetic inputs are cached")
+    parser.add_argument("--save", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/RSS growth (0.25 = 25%%)")
+    parser.add_argument("--list", action="store_true", help="list case names without running them")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    if args.list:
+        spec = PRESETS[args.preset]
+        # names only, without synthesising inputs
+        for cover in spec["covers"]:
+            for payload in spec["payloads"]:
+                for group in ("steg.embed", "steg.decode"):
+                    print(f"{group}[{cover}-{payload}]")
+        for cover in spec["format_covers"]:
+            for output_format in OUTPUT_FORMATS:
+                if output_format != DEFAULT_OUTPUT_FORMAT:
+                    print(f"steg.embed[{cover}-{FORMAT_PAYLOAD}-{output_format}]")
+        for profile, seconds in spec["audio"]:
+            groups = ["fsk.encode", "fsk.decode"] + (["fsk.decode_parallel"] if seconds >= PARALLEL_MIN_SECONDS else [])
+            for group in groups:
+                print(f"{group}[{profile}-{seconds}s]")
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print(f"Preparing inputs in {args.work_dir} ...", file=sys.stderr)
+    cases = build_cases(args.preset, args.work_dir, args.filter)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="steg-bench-out-") as out_dir:
+        for case in cases:
+            result = run_case(case, args.repeat, out_dir)
+            results[case.name] = result
+            if "error" in result:
+                print(f"{case.name:40s} ERROR {result['error']}", flush=True)
+                continue
+            rss = f"{result['peak_rss_mb']:7.0f} MB" if result["peak_rss_mb"] else "      ? MB"
+            line = f"{case.name:40s} {result['median_s']:9.4f}s  {_format_throughput(result)}  {rss}"
+            base = (baseline or {}).get(case.name)
+            if base and "median_s" in base:
+                line += f"  ({result['median_s'] / base['median_s']:.2f}x baseline)"
+            print(line, flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": _metadata(), "results": results}, f, indent=2)
+    failed = [name for name, r in results.items() if "error" in r]
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    if regressions:
+        print(f"Regressions over {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+    return 1 if failed or regressions else 0
@@ -0,0 +1,228 @@
+# instrumentation.py
+# Stage timing spans for the steg and FSK engines, plus opt-in per-job cProfile/tracemalloc capture.
+#
+#   with span("image.convert_rgba", pixels=n):
+#       ...
+#
+# Spans go to every registered sink. With no sink registered, span() returns a shared no-op
+# object, so instrumented code costs one function call per stage. Sinks can also be chosen
+# through the environment (inherited by worker processes):
+#   STEG_SPANS=log                    log each span at DEBUG on the "steg.spans" logger
+#   STEG_SPANS=counters               aggregate into the in-process registry (counters())
+#   STEG_SPANS=jsonl:/tmp/spans.jsonl append one JSON object per span
+#   STEG_SPANS=log,counters           several at once
+#   STEG_PROFILE_DIR=dir              cProfile each GUI/batch job into dir (see capture())
+#   STEG_PROFILE_MEMORY=1             also record tracemalloc peaks and top allocations
+
+import cProfile
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import partial
+
+_sinks = []
+_local = threading.local()
+_capture_ids = itertools.count(1)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("name", "attrs", "parent", "start")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter_ns() - self.start
+        stack = _local.stack
+        stack.pop()
+        record = {"name": self.name, "ms": elapsed / 1e6, "parent": self.parent, "depth": len(stack),
+                  "pid": os.getpid(), "thread": threading.current_thread().name}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.attrs)
+        for sink in list(_sinks):
+            sink.emit(record)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Attach attributes known only after the stage starts (sizes, counts)."""
+        self.attrs.update(attrs)
+
+def span(name: str, **attrs):
+    """Context manager timing one stage; a no-op unless a sink is registered."""
+    if not _sinks:
+        return _NOOP
+    return _Span(name, attrs)
+
+def enabled() -> bool:
+    return bool(_sinks)
+
+# ---------------------------------------------------------------- sinks
+
+class LoggingSink:
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG):
+        self.logger = logger or logging.getLogger("steg.spans")
+        self.level = level
+
+    def emit(self, record: dict) -> None:
+        if self.logger.isEnabledFor(self.level):
+            extra = {k: v for k, v in record.items() if k not in ("name", "ms", "parent", "depth", "pid", "thread")}
+            self.logger.log(self.level, "%s%s %.3f ms %s", "  " * record["depth"], record["name"], record["ms"],
+                            extra or "")
+
+class JsonLinesSink:
+    """Appends one JSON object per span; safe to share between threads and processes."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        line = json.dumps(dict(record, time=time.time()), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)  # one short append per span, so lines from processes do not interleave
+
+class CounterSink:
+    """In-process registry: count, total and max milliseconds per span name."""
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(record["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += record["ms"]
+            stats["max_ms"] = max(stats["max_ms"], record["ms"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def report(self) -> str:
+        rows = sorted(self.snapshot().items(), key=lambda item: -item[1]["total_ms"])
+        lines = [f"{'span':28s} {'count':>7s} {'total ms':>10s} {'mean ms':>9s} {'max ms':>9s}"]
+        for name, s in rows:
+            lines.append(f"{name:28s} {s['count']:7d} {s['total_ms']:10.2f} "
+                         f"{s['total_ms'] / s['count']:9.3f} {s['max_ms']:9.3f}")
+        return "\n".join(lines)
+
+_counters = CounterSink()
+
+def counters() -> CounterSink:
+    """The shared registry used by STEG_SPANS=counters (register it with add_sink to use it directly)."""
+    return _counters
+
+def add_sink(sink) -> None:
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+def remove_sink(sink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+@contextmanager
+def recording(sink=None):
+    """Register sink (default: a fresh CounterSink) for the duration of the block and yield it."""
+    sink = sink or CounterSink()
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+def configure_from_env(environ=None) -> None:
+    environ = os.environ if environ is None else environ
+    for item in filter(None, (part.strip() for part in environ.get("STEG_SPANS", "").split(","))):
+        if item == "log":
+            add_sink(LoggingSink())
+        elif item == "counters":
+            add_sink(_counters)
+        elif item.startswith("jsonl:"):
+            add_sink(JsonLinesSink(item[len("jsonl:"):]))
+        else:
+            logging.getLogger("steg.spans").warning("Unknown STEG_SPANS sink %r; use log, counters or jsonl:PATH.", item)
+
+# ---------------------------------------------------------------- per-job capture
+
+def profile_settings(environ=None):
+    """(out_dir, trace_memory) from STEG_PROFILE_DIR / STEG_PROFILE_MEMORY; out_dir None when off."""
+    environ = os.environ if environ is None else environ
+    return environ.get("STEG_PROFILE_DIR") or None, environ.get("STEG_PROFILE_MEMORY", "") not in ("", "0")
+
+@contextmanager
+def capture(label: str, out_dir: str, cprofile: bool = True, memory: bool = False, top: int = 25):
+    """
+    Profile the block into out_dir: <label>-<time>-<pid>-<n>.prof (cProfile, open with pstats or
+    snakeviz) and, with memory=True, <...>.memory.txt holding the tracemalloc peak and the top
+    allocation sites. tracemalloc is process-wide, so concurrent jobs share its numbers.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    safe_label = re.sub(r"[^\w.-]+", "_", label)
+    stem = os.path.join(out_dir, f"{safe_label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_capture_ids)}")
+    profiler = cProfile.Profile() if cprofile else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+    if profiler:
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active in this process
+            profiler = None
+    try:
+        with span("job", label=label):
+            yield stem
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(stem + ".prof")
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+            if started_tracing:
+                tracemalloc.stop()
+            with open(stem + ".memory.txt", "w", encoding="utf-8") as f:
+                f.write(f"{label}\npeak {peak / 2**20:.1f} MiB, still allocated {current / 2**20:.1f} MiB\n\n")
+                f.writelines(f"{stat}\n" for stat in stats)
+
+def _call_captured(fn, label, out_dir, memory, *args, **kwargs):
+    with capture(label, out_dir, memory=memory):
+        return fn(*args, **kwargs)
+
+def captured(fn, label: str, out_dir: str, memory: bool = False):
+    """fn wrapped so each call runs under capture(); picklable, so it works in process pools."""
+    return partial(_call_captured, fn, label, out_dir, memory)
+
+configure_from_env()
@@ -0,0 +1,186 @@
+# job_manager.py
+# Runs slow engine calls off the Tk main thread: a thread pool for I/O-bound jobs and a process
+# pool for CPU-bound ones. Engine functions take a progress(done, total) callback; workers only
+# record progress, and the manager picks it up on the Tk thread with after(), so no widget is
+# ever touched from a worker. Cancelling makes the job's next progress call raise JobCancelled.
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from instrumentation import captured, profile_settings
+
+POLL_MS = 100
+PROGRESS_INTERVAL = 0.1  # seconds between progress messages from a worker process
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled."""
+
+class Job:
+    def __init__(self, job_id: int, label: str, process: bool, on_done):
+        self.job_id = job_id
+        self.label = label
+        self.process = process
+        self.on_done = on_done
+        self.started = time.perf_counter()
+        self.finished = None
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.future = None
+        self.cancel_event = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def fraction(self):
+        """Completed share (0-1), or None before the job has reported any progress."""
+        return min(self.done / self.total, 1.0) if self.total else None
+
+    @property
+    def cancelled(self) -> bool:
+        return isinstance(self.error, (JobCancelled, CancelledError))
+
+    def _progress(self, done: int, total: int) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"{self.label} cancelled.")
+        self.done, self.total = done, total
+
+def _run_in_process(fn, args, kwargs, job_id, progress_queue, cancel_event):
+    """Process-pool entry point: forwards fn's progress over progress_queue, throttled."""
+    last = 0.0
+
+    def progress(done, total):
+        nonlocal last
+        if cancel_event.is_set():
+            raise JobCancelled("Cancelled.")
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL or done >= total:
+            last = now
+            progress_queue.put((job_id, done, total))
+
+    return fn(*args, progress=progress, **kwargs)
+
+class JobManager:
+    """
+    Shared job runner for the GUI tabs. submit() returns at once; on_done(job, result) is later
+    called on the Tk thread, with job.error set (and job.cancelled true) if the job failed or was
+    cancelled. on_update(manager) runs on every poll while jobs are active, for status displays.
+    With STEG_PROFILE_DIR set, every job is captured with cProfile (and tracemalloc if
+    STEG_PROFILE_MEMORY=1) into that folder.
+    """
+    def __init__(self, root, on_update=None, thread_workers: int = 4, process_workers: int = None):
+        self.root = root
+        self.on_update = on_update
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.jobs = []  # active, oldest first
+        self.last_finished = None
+        self._ids = itertools.count(1)
+        self._threads = None
+        self._processes = None
+        self._mp_manager = None
+        self._progress_queue = None
+        self._poll_id = None
+        self.profile_dir, self.trace_memory = profile_settings()
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="job")
+        return self._threads
+
+    def _process_pool(self):
+        # imported on the first process job rather than at app startup
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+        if self._mp_manager is None:
+            self._mp_manager = multiprocessing.Manager()
+            self._progress_queue = self._mp_manager.Queue()
+        return self._processes
+
+    def submit(self, label: str, fn, *args, process: bool = False, on_done=None, **kwargs) -> Job:
+        """Run fn(*args, progress=..., **kwargs) in the thread pool, or the process pool if process=True."""
+        job = Job(next(self._ids), label, process, on_done)
+        if self.profile_dir:
+            fn = captured(fn, label, self.profile_dir, self.trace_memory)
+        if process:
+            pool = self._process_pool()
+            job.cancel_event = self._mp_manager.Event()
+            job.future = pool.submit(_run_in_process, fn, args, kwargs, job.job_id,
+                                     self._progress_queue, job.cancel_event)
+        else:
+            job.cancel_event = threading.Event()
+            job.future = self._thread_pool().submit(fn, *args, progress=job._progress, **kwargs)
+        self.jobs.append(job)
+        self._notify()
+        if self._poll_id is None:
+            self._poll_id = self.root.after(POLL_MS, self._poll)
+        return job
+
+    def cancel(self, job: Job = None) -> None:
+        """Cancel one job, or every active job when job is None."""
+        for j in [job] if job else list(self.jobs):
+            j.cancel_event.set()
+            j.future.cancel()  # only succeeds if the job has not started yet
+
+    def _drain_progress(self) -> None:
+        if self._progress_queue is None:
+            return
+        by_id = {job.job_id: job for job in self.jobs}
+        while True:
+            try:
+                job_id, done, total = self._progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            if job_id in by_id:
+                by_id[job_id].done, by_id[job_id].total = done, total
+
+    def _poll(self) -> None:
+        self._poll_id = None
+        try:
+            self._drain_progress()
+            for job in [j for j in self.jobs if j.future.done()]:
+                self.jobs.remove(job)
+                self._finish(job)
+            self._notify()
+        finally:
+            if self.jobs:
+                self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def _finish(self, job: Job) -> None:
+        job.finished = time.perf_counter()
+        result = None
+        try:
+            result = job.future.result()
+        except BaseException as e:
+            job.error = e
+            if job.process:
+                from concurrent.futures.process import BrokenProcessPool
+                if isinstance(e, BrokenProcessPool):
+                    self._processes.shutdown(wait=False)
+                    self._processes = None
+        self.last_finished = job
+        if job.on_done:
+            job.on_done(job, result)
+
+    def _notify(self) -> None:
+        if self.on_update:
+            self.on_update(self)
+
+    def shutdown(self) -> None:
+        """Cancel everything and stop the pools (call before the window is destroyed)."""
+        self.cancel()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
@@ -1,12 +1,32 @@
 # main_gui.py
 
+import importlib
 import tkinter as tk
 from tkinter import ttk
 
-from sstv_tab.encode_tab import EncodeTab
-from sstv_tab.decode_tab import DecodeTab
-from steg_tab.sender_tab import SenderTab
-from steg_tab.receiver_tab import ReceiverTab
+from job_manager import JobManager
+
+# (label, module, class) per notebook page; each module is imported when its page is first shown
+STEG_PAGES = [("Sender", "steg_tab.sender_tab", "SenderTab"),
+              ("Receiver", "steg_tab.receiver_tab", "ReceiverTab")]
+SSTV_PAGES = [("Encode", "sstv_tab.encode_tab", "EncodeTab"),
+              ("Decode", "sstv_tab.decode_tab", "DecodeTab")]
+
+class LazyPage(ttk.Frame):
+    """Notebook page placeholder that imports and builds its tab on first build()."""
+    def __init__(self, parent, module: str, class_name: str, *args):
+        super().__init__(parent)
+        self.module = module
+        self.class_name = class_name
+        self.args = args
+        self.tab = None
+
+    def build(self):
+        if self.tab is None:
+            tab_class = getattr(importlib.import_module(self.module), self.class_name)
+            self.tab = tab_class(self, *self.args)
+            self.tab.pack(fill="both", expand=True)
+        return self.tab
 
 class SecureMessengerApp(tk.Tk):
     def __init__(self):
@@ -35,27 +55,68 @@ class SecureMessengerApp(tk.Tk):
         style.configure("TLabel", background="#eef2f7", font=("Segoe UI", 11))
         style.configure("TButton", font=("Segoe UI", 11))
 
-        # ---------------- Main Notebook ----------------
-        notebook = ttk.Notebook(self)
-        notebook.pack(fill="both", expand=True, padx=20, pady=20)
-
-        # STEGANOGRAPHY
-        steg = ttk.Notebook(notebook)
-        steg.add(SenderTab(steg), text="Sender")
-        steg.add(ReceiverTab(steg), text="Receiver")
-        notebook.add(steg, text="Steganography")
+        # background jobs report progress to the status bar
+        self.jobs = JobManager(self, on_update=self._show_jobs)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
-        # SSTV
-        sstv = ttk.Notebook(notebook)
-        sstv.add(EncodeTab(sstv), text="Encode")
-        sstv.add(DecodeTab(sstv), text="Decode")
-        notebook.add(sstv, text="SSTV")
+        # ---------------- Main Notebook ----------------
+        # pages are built on first selection; the first one once the window is up
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill="both", expand=True, padx=20, pady=20)
+        self._add_section("Steganography", STEG_PAGES)
+        self._add_section("SSTV", SSTV_PAGES)
+        self.notebook.bind("<<NotebookTabChanged>>", self._build_visible_page)
+        self.after_idle(self._build_visible_page)
 
         # ---------------- Status Bar ----------------
-        self.status = tk.Label(self, text="Ready",
-                               bd=1, relief=tk.SUNKEN, anchor="w",
+        status_bar = tk.Frame(self, bd=1, relief=tk.SUNKEN, bg="#cdd8eb")
+        status_bar.pack(fill="x", side="bottom")
+        self.cancel_button = ttk.Button(status_bar, text="Cancel", command=self.jobs.cancel, state="disabled")
+        self.cancel_button.pack(side="right", padx=4, pady=2)
+        self.progress = ttk.Progressbar(status_bar, length=200, mode="determinate", maximum=1.0)
+        self.progress.pack(side="right", padx=4)
+        self.status = tk.Label(status_bar, text="Ready", anchor="w",
                                bg="#cdd8eb", font=("Segoe UI", 10))
-        self.status.pack(fill="x", side="bottom")
+        self.status.pack(fill="x", side="left", expand=True)
+
+    def _add_section(self, text, pages):
+        section = ttk.Notebook(self.notebook)
+        for label, module, class_name in pages:
+            section.add(LazyPage(section, module, class_name, self.jobs), text=label)
+        section.bind("<<NotebookTabChanged>>", self._build_visible_page)
+        self.notebook.add(section, text=text)
+
+    def _build_visible_page(self, event=None):
+        if not self.notebook.select():
+            return
+        section = self.nametowidget(self.notebook.select())
+        if section.select():
+            self.nametowidget(section.select()).build()
+
+    def _show_jobs(self, jobs):
+        if jobs.jobs:
+            job = jobs.jobs[-1]
+            fraction = job.fraction
+            text = job.label + (f" — {fraction:.0%}" if fraction is not None else "…") + f" ({job.elapsed:.1f}s)"
+            if len(jobs.jobs) > 1:
+                text += f"  +{len(jobs.jobs) - 1} more"
+            if fraction is None:
+                self.progress.config(mode="indeterminate")
+                self.progress.step(0.05)
+            else:
+                self.progress.config(mode="determinate", value=fraction)
+            self.cancel_button.state(["!disabled"])
+        else:
+            job = jobs.last_finished
+            outcome = "cancelled" if job.cancelled else "failed" if job.error else "done"
+            text = f"{job.label}: {outcome} in {job.elapsed:.1f}s"
+            self.progress.config(mode="determinate", value=0)
+            self.cancel_button.state(["disabled"])
+        self.status.config(text=text)
+
+    def _on_close(self):
+        self.jobs.shutdown()
+        self.destroy()
 
 
 if __name__ == "__main__":
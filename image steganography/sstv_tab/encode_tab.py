@@ -1,12 +1,13 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import numpy as np
-import wave
 import os
 
+from .profiles import PROFILES, DEFAULT_PROFILE  # the modem itself (NumPy) loads on first convert
+
 class EncodeTab(ttk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, jobs):
         super().__init__(parent)
+        self.jobs = jobs  # shared JobManager; synthesis runs in its process pool
         self.selected_file = None
 
         tk.Label(self, text="SSTV Encode (Image → Audio)", font=("Arial", 14)).pack(pady=10)
@@ -14,7 +15,21 @@ class EncodeTab(ttk.Frame):
         self.file_label.pack(pady=5)
 
         tk.Button(self, text="Select Image", command=self.load_image).pack(pady=5)
-        tk.Button(self, text="Convert to Audio", command=self.convert_to_audio).pack(pady=10)
+
+        # modulation profile; the decoder detects it from the preamble
+        self.profile_var = tk.StringVar(value=DEFAULT_PROFILE)
+        frame_profile = ttk.Frame(self)
+        frame_profile.pack(pady=5)
+        ttk.Label(frame_profile, text="Mode:").pack(side="left")
+        ttk.Combobox(frame_profile, textvariable=self.profile_var, values=list(PROFILES),
+                     state="readonly", width=12).pack(side="left", padx=5)
+        self.profile_label = ttk.Label(frame_profile, text=PROFILES[DEFAULT_PROFILE].description)
+        self.profile_label.pack(side="left")
+        self.profile_var.trace_add("write", lambda *_: self.profile_label.config(
+            text=PROFILES[self.profile_var.get()].description))
+
+        self.convert_button = tk.Button(self, text="Convert to Audio", command=self.convert_to_audio)
+        self.convert_button.pack(pady=10)
 
     def load_image(self):
         filetypes = [("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif"), ("All files", "*.*")]
@@ -27,33 +42,21 @@ class EncodeTab(ttk.Frame):
         if not self.selected_file:
             messagebox.showerror("Error", "Please select an image first!")
             return
-        try:
-            with open(self.selected_file, "rb") as f:
-                data = f.read()
-
-            bits = ''.join(f"{byte:08b}" for byte in data)
-
-            sample_rate = 16000
-            duration = 0.001
-            t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-            low_freq = 1000
-            high_freq = 2000
-
-            audio = []
-            for bit in bits:
-                freq = high_freq if bit == "1" else low_freq
-                audio.extend(np.sin(2*np.pi*freq*t))
-
-            audio = np.array(audio, dtype=np.float32)
-            output_file = os.path.splitext(self.selected_file)[0] + "_sstv.wav"
-
-            with wave.open(output_file, "w") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(sample_rate)
-                wf.writeframes((audio * 32767).astype(np.int16).tobytes())
-
-            messagebox.showinfo("Success", f"Audio saved as:\n{output_file}")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to encode image: {e}")
+        from .fsk import encode_file_to_wav
+        output_file = os.path.splitext(self.selected_file)[0] + "_sstv.wav"
+        self.convert_button.config(state="disabled")
+        self.jobs.submit("Encoding audio", encode_file_to_wav, self.selected_file, output_file,
+                         self.profile_var.get(), process=True,
+                         on_done=lambda job, _: self._convert_done(job, output_file))
+
+    def _convert_done(self, job, output_file):
+        self.convert_button.config(state="normal")
+        if job.cancelled:
+            try:
+                os.remove(output_file)  # partial output
+            except OSError:
+                pass
+        elif job.error:
+            messagebox.showerror("Error", f"Failed to encode image: {job.error}")
+        else:
+            messagebox.showinfo("Success", f"Audio saved as:\n{output_file}\n({job.elapsed:.1f}s)")
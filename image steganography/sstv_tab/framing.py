@@ -0,0 +1,135 @@
+# sstv_tab/framing.py
+# Packet layer for the FSK bitstream, so a recording can be cut anywhere, decoded in pieces
+# and checked frame by frame.
+#
+# frame = SYNC (4) | seq (u32) | total_size (u32) | length (u16) | payload | CRC32 (u32)
+# The CRC covers seq..payload. total_size is the size of the whole file, which lets the
+# decoder size the output and name the missing frames even when the last ones are lost.
+
+import struct
+import zlib
+import numpy as np
+
+SYNC = b"\x1a\xcf\xfc\x1d"
+FRAME_PAYLOAD = 1024
+_HEADER = struct.Struct(">IIH")
+_CRC = struct.Struct(">I")
+FRAME_OVERHEAD = len(SYNC) + _HEADER.size + _CRC.size
+MAX_FRAME_BYTES = FRAME_OVERHEAD + FRAME_PAYLOAD
+MAX_FRAME_BITS = MAX_FRAME_BYTES * 8
+
+def frame_count(total_size: int) -> int:
+    return -(-total_size // FRAME_PAYLOAD)
+
+def build_frame(seq: int, total_size: int, payload: bytes) -> bytes:
+    body = _HEADER.pack(seq, total_size, len(payload)) + payload
+    return SYNC + body + _CRC.pack(zlib.crc32(body) & 0xFFFFFFFF)
+
+def iter_frames(src, total_size: int):
+    """Frame bytes for the binary file src, FRAME_PAYLOAD bytes of it per frame."""
+    seq = 0
+    while True:
+        payload = src.read(FRAME_PAYLOAD)
+        if not payload:
+            return
+        yield build_frame(seq, total_size, payload)
+        seq += 1
+
+def _parse_at(data: bytes, pos: int):
+    """(seq, total_size, payload) for a valid frame at data[pos:], None if invalid, ... if incomplete."""
+    start = pos + len(SYNC)
+    if start + _HEADER.size > len(data):
+        return ...
+    seq, total_size, length = _HEADER.unpack_from(data, start)
+    if length > FRAME_PAYLOAD or seq >= max(frame_count(total_size), 1):
+        return None
+    end = start + _HEADER.size + length
+    if end + _CRC.size > len(data):
+        return ...
+    if zlib.crc32(data[start:end]) & 0xFFFFFFFF != _CRC.unpack_from(data, end)[0]:
+        return None
+    return seq, total_size, data[end - length:end]
+
+def find_frames(bits: np.ndarray):
+    """
+    Scan a 0/1 bit array for CRC-valid frames starting at any bit offset, so bit slips only
+    cost the frames they hit. Returns (frames, consumed) where frames is a list of
+    (seq, total_size, payload) and bits before `consumed` can never start another frame.
+    """
+    shifted = [np.packbits(bits[shift:]).tobytes() for shift in range(min(8, len(bits)))]
+    candidates = []
+    for shift, data in enumerate(shifted):
+        pos = data.find(SYNC)
+        while pos != -1:
+            candidates.append((shift + 8 * pos, shift, pos))
+            pos = data.find(SYNC, pos + 1)
+    candidates.sort()
+
+    frames = []
+    next_free = 0
+    incomplete_from = None
+    for bit_pos, shift, pos in candidates:
+        if bit_pos < next_free:
+            continue
+        frame = _parse_at(shifted[shift], pos)
+        if frame is ...:
+            if incomplete_from is None:
+                incomplete_from = bit_pos
+            continue
+        if frame is not None:
+            frames.append(frame)
+            next_free = bit_pos + (FRAME_OVERHEAD + len(frame[2])) * 8
+    consumed = max(next_free, len(bits) - (MAX_FRAME_BITS - 1))
+    if incomplete_from is not None:
+        consumed = min(consumed, incomplete_from)
+    return frames, max(consumed, 0)
+
+class StreamingDeframer:
+    """Collects demodulated bits across blocks and returns frames as they complete."""
+    def __init__(self):
+        self._bits = np.empty(0, dtype=np.uint8)
+
+    def feed(self, bits: np.ndarray):
+        if self._bits.size:
+            bits = np.concatenate([self._bits, bits])
+        frames, consumed = find_frames(bits)
+        self._bits = bits[consumed:]
+        return frames
+
+class FrameAssembler:
+    """
+    Writes frame payloads to a binary file in sequence order. Frames must arrive with
+    increasing seq; gaps (lost frames) are zero-filled so later data keeps its offset.
+    """
+    def __init__(self, out):
+        self.out = out
+        self.total_size = None
+        self.received = 0
+        self.bytes_written = 0
+        self.lost = []
+        self._next_seq = 0
+
+    def add(self, seq: int, total_size: int, payload: bytes) -> None:
+        if seq < self._next_seq:
+            return  # duplicate from overlapping segments
+        if self.total_size is None:
+            self.total_size = total_size
+        self._fill_to(seq)
+        self.out.write(payload)
+        self.bytes_written += len(payload)
+        self.received += 1
+        self._next_seq = seq + 1
+
+    def _fill_to(self, seq: int) -> None:
+        for missing in range(self._next_seq, seq):
+            self.lost.append(missing)
+            size = min(FRAME_PAYLOAD, self.total_size - missing * FRAME_PAYLOAD)
+            self.out.write(bytes(size))
+            self.bytes_written += size
+
+    def finish(self) -> list:
+        """Zero-fill any lost frames at the end; returns the list of lost frame numbers."""
+        if self.total_size is not None:
+            self._fill_to(frame_count(self.total_size))
+            self._next_seq = frame_count(self.total_size)
+        return self.lost
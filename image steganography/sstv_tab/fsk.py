@@ -0,0 +1,518 @@
+# sstv_tab/fsk.py
+# M-ary FSK modem shared by EncodeTab/DecodeTab. The original format is "bfsk": one bit per
+# 1 ms tone, 1000 Hz = 0, 2000 Hz = 1. Faster profiles send several bits per tone; the encoder
+# announces the profile in a short bfsk preamble and the decoder picks it up from there.
+# Recordings without a preamble are decoded as plain bfsk. New recordings carry the data in
+# CRC-checked frames (see framing.py), flagged in the preamble, so long captures can be
+# decoded in parallel segments and lost frames are reported instead of corrupting the rest.
+#
+# Headless use (raw PCM on stdin must be mono signed 16-bit little-endian):
+#   python -m sstv_tab.fsk encode image.png image_sstv.wav --profile 16fsk
+#   python -m sstv_tab.fsk decode image_sstv.wav image_decoded.png --workers 4
+#   arecord -f S16_LE -c 1 -r 48000 -t raw | python -m sstv_tab.fsk decode - out.bin --rate 48000
+#   python -m sstv_tab.fsk check --profile 16fsk   (decode with samples dropped mid-recording)
+
+import argparse
+import dataclasses
+import math
+import os
+import sys
+import numpy as np
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+
+from instrumentation import span
+
+from .profiles import DEFAULT_PROFILE, PROFILES, PROFILES_BY_ID, FSKProfile
+from .framing import (MAX_FRAME_BITS, FrameAssembler, StreamingDeframer, find_frames,
+                      frame_count, iter_frames)
+
+AMPLITUDE = 32767
+BLOCK_BYTES = 4096  # input bytes synthesised per block
+BLOCK_FRAMES = 1 << 17  # audio frames demodulated per block
+SEGMENT_SECONDS = 60  # audio per parallel decode segment
+TRACK_SYMBOLS = 256  # symbols per timing-tracking window (framed recordings)
+
+# Preamble: magic + id byte + inverted id byte, sent as bfsk at the profile's sample rate.
+# The id byte is the profile id, with FRAMED_FLAG set when the data is framed.
+PREAMBLE_MAGIC = b"MFSK"
+PREAMBLE_BYTES = len(PREAMBLE_MAGIC) + 2
+FRAMED_FLAG = 0x80
+
+@dataclass
+class DecodeReport:
+    bytes_written: int
+    profile: "FSKProfile"
+    framed: bool = False
+    total_frames: int = 0
+    lost_frames: list = field(default_factory=list)
+
+def get_profile(profile) -> FSKProfile:
+    """Accept a profile name or an FSKProfile."""
+    if isinstance(profile, FSKProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown FSK profile {profile!r}; choose from {', '.join(PROFILES)}.")
+
+def bfsk_profile(sample_rate: int) -> FSKProfile:
+    """The original 1 ms, 1000/2000 Hz format at any sample rate (preambles, legacy recordings)."""
+    return dataclasses.replace(PROFILES["bfsk"], sample_rate=sample_rate, symbol_samples=sample_rate // 1000)
+
+def _preamble(profile: FSKProfile, framed: bool) -> bytes:
+    id_byte = profile.profile_id | (FRAMED_FLAG if framed else 0)
+    return PREAMBLE_MAGIC + bytes([id_byte, id_byte ^ 0xFF])
+
+def preamble_samples(sample_rate: int) -> int:
+    return PREAMBLE_BYTES * 8 * (sample_rate // 1000)
+
+class FSKModulator:
+    """
+    Phase-continuous FSK oscillator. Each tone starts where the previous one left off, so
+    symbol boundaries have no phase jumps; state carries across calls, so input can be fed
+    in blocks and only one block of samples exists at a time.
+    """
+    def __init__(self, profile=DEFAULT_PROFILE, phase: float = 0.0):
+        self.profile = get_profile(profile)
+        # phase advance per sample for each symbol value
+        self._step = 2 * np.pi * np.array(self.profile.tones, dtype=np.float64) / self.profile.sample_rate
+        self._phase = phase
+        self._carry = np.empty(0, dtype=np.uint8)  # bits short of a whole symbol
+
+    @property
+    def phase(self) -> float:
+        return self._phase
+
+    def modulate(self, data: bytes, final: bool = False) -> np.ndarray:
+        """
+        int16 samples for data's bits (MSB first), continuing from the previous call.
+        Bits that do not fill a whole symbol wait for the next call; final=True zero-pads them.
+        """
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        if self._carry.size:
+            bits = np.concatenate([self._carry, bits])
+        bps = self.profile.bits_per_symbol
+        if final and len(bits) % bps:
+            bits = np.concatenate([bits, np.zeros(bps - len(bits) % bps, dtype=np.uint8)])
+        whole = len(bits) - len(bits) % bps
+        self._carry = bits[whole:]
+        symbols = bits[:whole]
+        if bps > 1:
+            weights = 1 << np.arange(bps - 1, -1, -1)
+            symbols = symbols.reshape(-1, bps) @ weights
+        steps = np.repeat(self._step[symbols], self.profile.symbol_samples)
+        phase = np.cumsum(steps)
+        phase -= steps  # phase at the start of each sample
+        phase += self._phase
+        if steps.size:
+            self._phase = float((phase[-1] + steps[-1]) % (2 * np.pi))
+        return (np.sin(phase) * AMPLITUDE).astype(np.int16)
+
+    def flush(self) -> np.ndarray:
+        return self.modulate(b"", final=True)
+
+class FSKDemodulator:
+    """
+    Decides each symbol by measuring signal energy at the profile's tones only: a batched
+    Goertzel, done as one matrix product of the (symbols x samples) frame matrix with
+    precomputed cosine/sine tables for every tone.
+    """
+    def __init__(self, profile=DEFAULT_PROFILE):
+        self.profile = get_profile(profile)
+        self.samples_per_symbol = self.profile.symbol_samples
+        n = np.arange(self.samples_per_symbol)
+        angles = 2 * np.pi * np.outer(n, self.profile.tones) / self.profile.sample_rate
+        # columns: cos of every tone, then sin of every tone
+        self._tables = np.hstack([np.cos(angles), np.sin(angles)]).astype(np.float32)
+        self._shifts = np.arange(self.profile.bits_per_symbol - 1, -1, -1)
+
+    def symbol_energies(self, samples: np.ndarray) -> np.ndarray:
+        """(symbols x tones) energy for every whole symbol in samples."""
+        n_symbols = len(samples) // self.samples_per_symbol
+        frames = samples[:n_symbols * self.samples_per_symbol].reshape(n_symbols, self.samples_per_symbol)
+        proj = frames.astype(np.float32) @ self._tables
+        proj *= proj
+        n_tones = len(self.profile.tones)
+        return proj[:, :n_tones] + proj[:, n_tones:]
+
+    def _energies_to_bits(self, energies: np.ndarray) -> np.ndarray:
+        symbols = np.argmax(energies, axis=1)
+        if energies.shape[1] == 2:
+            return symbols.astype(np.uint8)
+        return ((symbols[:, None] >> self._shifts) & 1).astype(np.uint8).reshape(-1)
+
+    def demodulate_bits(self, samples: np.ndarray) -> np.ndarray:
+        """Bits (MSB first) for every whole symbol in samples; a trailing partial symbol is ignored."""
+        return self._energies_to_bits(self.symbol_energies(samples))
+
+    def demodulate_tracked(self, samples: np.ndarray, final: bool = False, acquire: bool = False):
+        """
+        Demodulate while following symbol timing: each window of TRACK_SYMBOLS symbols may shift
+        by one step (1/8 symbol) either way, keeping the alignment whose symbols are most clearly
+        a single tone, so dropped or extra samples only cost the frame they land in.
+        acquire=True searches every step of the first window (alignment unknown).
+        Returns (bits, samples consumed); unconsumed samples belong in the next call.
+        """
+        sps = self.samples_per_symbol
+        step = max(1, sps // 8)
+        window = TRACK_SYMBOLS * sps
+        offsets = range(0, sps, step) if acquire else (0, -step, step)
+        pos = 0
+        bits = []
+        while len(samples) - pos >= window + step:
+            best = None
+            for offset in offsets:
+                start = pos + offset
+                if start < 0:
+                    continue
+                energies = self.symbol_energies(samples[start:start + window])
+                clarity = float((energies.max(axis=1) / (energies.sum(axis=1) + 1e-9)).mean())
+                if best is None or clarity > best[0]:
+                    best = (clarity, start, energies)
+            _, start, energies = best
+            bits.append(self._energies_to_bits(energies))
+            pos = start + window
+            offsets = (0, -step, step)
+        if final:
+            tail = samples[pos:]
+            # a slip the tracker's step cannot undo (an odd number of samples, say) leaves the
+            # last symbol a little short; zero-pad it rather than lose the frame it ends
+            if len(tail) % sps >= sps // 2:
+                tail = np.concatenate([tail, np.zeros(sps - len(tail) % sps, dtype=tail.dtype)])
+            bits.append(self.demodulate_bits(tail))
+            pos = len(samples)
+        return (np.concatenate(bits) if bits else np.empty(0, dtype=np.uint8)), pos
+
+    def demodulate(self, samples: np.ndarray) -> bytes:
+        """Bytes for samples (MSB first); a trailing partial byte is dropped."""
+        bits = self.demodulate_bits(samples)
+        return np.packbits(bits[:len(bits) - len(bits) % 8]).tobytes()
+
+def detect_profile(samples: np.ndarray, sample_rate: int):
+    """
+    Look for a preamble at the start of samples. Returns (profile, samples to skip, framed);
+    without a preamble the recording is treated as unframed legacy bfsk from sample 0.
+    """
+    skip = preamble_samples(sample_rate)
+    head = FSKDemodulator(bfsk_profile(sample_rate)).demodulate(samples[:skip])
+    if (len(head) == PREAMBLE_BYTES and head.startswith(PREAMBLE_MAGIC)
+            and head[-2] ^ head[-1] == 0xFF and head[-2] & ~FRAMED_FLAG in PROFILES_BY_ID):
+        profile = PROFILES_BY_ID[head[-2] & ~FRAMED_FLAG]
+        if profile.sample_rate != sample_rate:
+            raise ValueError(f"Recording is {sample_rate} Hz but profile {profile.name} needs {profile.sample_rate} Hz.")
+        return profile, skip, bool(head[-2] & FRAMED_FLAG)
+    return bfsk_profile(sample_rate), 0, False
+
+class StreamingFSKDecoder:
+    """
+    Feeds audio blocks of any length through an FSKDemodulator, detecting the profile from
+    the preamble first. Samples short of a whole symbol and bits short of a whole byte are
+    carried into the next block, so block boundaries never shift symbol or byte alignment.
+    """
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.profile = None
+        self.framed = False
+        self._demodulator = None
+        self._preamble_samples = preamble_samples(sample_rate)
+        self._samples = np.empty(0, dtype=np.int16)
+        self._bits = np.empty(0, dtype=np.uint8)
+
+    def feed_bits(self, samples: np.ndarray, final: bool = False) -> np.ndarray:
+        """Demodulated bits for every whole symbol received so far."""
+        if self._samples.size:
+            samples = np.concatenate([self._samples, samples])
+        if self._demodulator is None:
+            if len(samples) < self._preamble_samples and not final:
+                self._samples = samples.copy()
+                return np.empty(0, dtype=np.uint8)
+            self.profile, skip, self.framed = detect_profile(samples, self.sample_rate)
+            self._demodulator = FSKDemodulator(self.profile)
+            samples = samples[skip:]
+        if self.framed:
+            bits, consumed = self._demodulator.demodulate_tracked(samples, final)
+            self._samples = samples[consumed:].copy()
+            return bits
+        sps = self._demodulator.samples_per_symbol
+        whole = len(samples) - len(samples) % sps
+        self._samples = samples[whole:].copy()
+        return self._demodulator.demodulate_bits(samples[:whole])
+
+    def feed(self, samples: np.ndarray, final: bool = False) -> bytes:
+        """Demodulated bytes for every whole byte received so far."""
+        bits = self.feed_bits(samples, final)
+        if self._bits.size:
+            bits = np.concatenate([self._bits, bits])
+        whole = len(bits) - len(bits) % 8
+        self._bits = bits[whole:]
+        return np.packbits(bits[:whole]).tobytes()
+
+    def finish(self) -> bytes:
+        """Decode whatever is buffered (only matters for recordings shorter than a preamble)."""
+        return self.feed(np.empty(0, dtype=np.int16), final=True)
+
+def _check_pcm_format(wf) -> None:
+    if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+        raise ValueError("Expected a mono 16-bit WAV file.")
+
+def iter_wav_blocks(wf, block_frames: int = BLOCK_FRAMES):
+    """int16 sample blocks from an open wave reader, block_frames at a time."""
+    while True:
+        data = wf.readframes(block_frames)
+        if not data:
+            return
+        yield np.frombuffer(data, dtype=np.int16)
+
+def iter_pcm_blocks(stream, block_frames: int = BLOCK_FRAMES):
+    """int16 sample blocks from a binary stream of raw mono s16le PCM (e.g. stdin)."""
+    block_bytes = block_frames * 2
+    carry = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            return
+        data = carry + data
+        usable = len(data) - len(data) % 2
+        carry = data[usable:]
+        yield np.frombuffer(data[:usable], dtype="<i2").astype(np.int16, copy=False)
+
+def decode_blocks(blocks, sample_rate: int, out) -> DecodeReport:
+    """
+    Demodulate sample blocks, writing bytes to the binary file out as they are produced.
+    Framed recordings are checked frame by frame; lost frames are zero-filled and reported.
+    """
+    decoder = StreamingFSKDecoder(sample_rate)
+    deframer = StreamingDeframer()
+    assembler = FrameAssembler(out)
+    carry = np.empty(0, dtype=np.uint8)  # unframed: bits short of a whole byte
+    written = 0
+
+    def consume(bits):
+        nonlocal carry, written
+        if decoder.framed:
+            for frame in deframer.feed(bits):
+                assembler.add(*frame)
+            return
+        if carry.size:
+            bits = np.concatenate([carry, bits])
+        whole = len(bits) - len(bits) % 8
+        carry = bits[whole:]
+        data = np.packbits(bits[:whole]).tobytes()
+        out.write(data)
+        written += len(data)
+
+    blocks = iter(blocks)
+    while True:
+        with span("wav.read"):
+            samples = next(blocks, None)
+        if samples is None:
+            break
+        with span("fsk.demodulate", frames=len(samples)):
+            bits = decoder.feed_bits(samples)
+        with span("fsk.deframe" if decoder.framed else "fsk.write", bits=len(bits)):
+            consume(bits)
+            out.flush()
+    with span("fsk.demodulate", frames=0):
+        bits = decoder.feed_bits(np.empty(0, dtype=np.int16), final=True)
+    consume(bits)
+    if decoder.framed:
+        lost = assembler.finish()
+        total = frame_count(assembler.total_size or 0)
+        return DecodeReport(assembler.bytes_written, decoder.profile, True, total, lost)
+    return DecodeReport(written, decoder.profile)
+
+def encode_file_to_wav(input_path: str, output_path: str, profile=DEFAULT_PROFILE,
+                       block_bytes: int = BLOCK_BYTES, framed: bool = True, progress=None) -> None:
+    """
+    Stream input_path through the modulator into a mono 16-bit WAV, one block at a time.
+    With framed=True the data is sent as CRC-checked frames (see framing.py).
+    progress(bytes_read, file_size) is called after each block; it may raise to abort.
+    """
+    profile = get_profile(profile)
+    preamble = FSKModulator(bfsk_profile(profile.sample_rate))
+    preamble_audio = preamble.modulate(_preamble(profile, framed))
+    modulator = FSKModulator(profile, phase=preamble.phase)
+    with open(input_path, "rb") as src, wave.open(output_path, "w") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(profile.sample_rate)
+        wf.writeframes(preamble_audio.tobytes())
+        size = os.fstat(src.fileno()).st_size
+        if framed:
+            chunks = iter_frames(src, size)
+        else:
+            chunks = iter(lambda: src.read(block_bytes), b"")
+        for data in chunks:
+            with span("fsk.modulate", bytes=len(data)):
+                samples = modulator.modulate(data)
+            with span("wav.write", frames=len(samples)):
+                wf.writeframes(samples.tobytes())
+            if progress:
+                progress(src.tell(), size)
+        wf.writeframes(modulator.flush().tobytes())
+
+def _with_progress(blocks, total: int, progress):
+    done = 0
+    for samples in blocks:
+        yield samples
+        done += len(samples)
+        progress(done, total)
+
+def decode_wav_to_file(input_path: str, output_path: str, block_frames: int = BLOCK_FRAMES,
+                       progress=None) -> DecodeReport:
+    """
+    Demodulate a mono 16-bit FSK WAV into output_path block by block, so only one block of
+    audio is in memory however long the capture is.
+    progress(frames_done, total_frames) is called after each block; it may raise to abort.
+    """
+    with wave.open(input_path, "r") as wf, open(output_path, "wb") as out:
+        _check_pcm_format(wf)
+        blocks = iter_wav_blocks(wf, block_frames)
+        if progress:
+            blocks = _with_progress(blocks, wf.getnframes(), progress)
+        return decode_blocks(blocks, wf.getframerate(), out)
+
+def _decode_segment(input_path: str, profile_id: int, start_frame: int, n_frames: int) -> list:
+    """Worker: demodulate one slice of a framed recording and return its valid frames."""
+    with span("wav.read", frames=n_frames), wave.open(input_path, "r") as wf:
+        wf.setpos(start_frame)
+        samples = np.frombuffer(wf.readframes(n_frames), dtype=np.int16)
+    with span("fsk.demodulate", frames=len(samples)):
+        bits, _ = FSKDemodulator(PROFILES_BY_ID[profile_id]).demodulate_tracked(samples, final=True, acquire=True)
+    with span("fsk.deframe", bits=len(bits)):
+        return find_frames(bits)[0]
+
+def decode_wav_parallel(input_path: str, output_path: str, workers: int = None,
+                        segment_seconds: float = SEGMENT_SECONDS, progress=None) -> DecodeReport:
+    """
+    Decode a framed recording by splitting it into segments (overlapping by one frame) that are
+    demodulated across a process pool, then reassembling frames by sequence number.
+    Unframed or short recordings fall back to decode_wav_to_file.
+    progress(segments_done, segments) is called as segments finish; it may raise to abort.
+    """
+    with wave.open(input_path, "r") as wf:
+        _check_pcm_format(wf)
+        sample_rate = wf.getframerate()
+        n_frames = wf.getnframes()
+        head = np.frombuffer(wf.readframes(preamble_samples(sample_rate)), dtype=np.int16)
+    profile, skip, framed = detect_profile(head, sample_rate)
+    segment_samples = int(segment_seconds * sample_rate)
+    workers = workers or os.cpu_count() or 1
+    if not framed or workers == 1 or n_frames - skip <= segment_samples:
+        return decode_wav_to_file(input_path, output_path, progress=progress)
+
+    sps = profile.symbol_samples
+    total_symbols = (n_frames - skip) // sps
+    segment_symbols = max(1, segment_samples // sps)
+    overlap_symbols = math.ceil(MAX_FRAME_BITS / profile.bits_per_symbol) + 1
+    starts = [skip + s * sps for s in range(0, total_symbols, segment_symbols)]
+    # each segment runs one frame into the next, and the last one to the end of the file
+    lengths = [min(start + (segment_symbols + overlap_symbols) * sps, n_frames) - start for start in starts]
+    frames = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(starts))) as pool:
+        futures = [pool.submit(_decode_segment, input_path, profile.profile_id, start, length)
+                   for start, length in zip(starts, lengths)]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                for seq, total_size, payload in future.result():
+                    frames.setdefault(seq, (seq, total_size, payload))
+                if progress:
+                    progress(done, len(futures))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+
+    with span("fsk.assemble", frames=len(frames)), open(output_path, "wb") as out:
+        assembler = FrameAssembler(out)
+        for seq in sorted(frames):
+            assembler.add(*frames[seq])
+        lost = assembler.finish()
+        return DecodeReport(assembler.bytes_written, profile, True, frame_count(assembler.total_size or 0), lost)
+
+def describe_report(report: DecodeReport) -> str:
+    text = f"{report.bytes_written} bytes decoded ({report.profile.name})"
+    if report.framed:
+        text += f", {report.total_frames - len(report.lost_frames)}/{report.total_frames} frames"
+        if report.lost_frames:
+            text += f"; lost frames: {', '.join(map(str, report.lost_frames))} (zero-filled)"
+    return text
+
+def check_sample_slips(profile=DEFAULT_PROFILE, drops=(1, 2, 3, 5, 8), data_bytes: int = 6000) -> list:
+    """
+    Encode random data, drop samples at a few points of the recording and decode it both
+    streaming and in parallel segments; only the frame a slip lands in may be lost.
+    Returns (drop, position, decoder, ok, report) rows.
+    """
+    import tempfile
+
+    profile = get_profile(profile)
+    rows = []
+    data = np.random.default_rng(11).integers(0, 256, data_bytes, dtype=np.uint8).tobytes()
+    with tempfile.TemporaryDirectory(prefix="fsk-slips-") as tmp:
+        source, clean = os.path.join(tmp, "data.bin"), os.path.join(tmp, "clean.wav")
+        with open(source, "wb") as f:
+            f.write(data)
+        encode_file_to_wav(source, clean, profile)
+        with wave.open(clean, "r") as wf:
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        for drop in drops:
+            for position in (len(samples) // 4, len(samples) // 2, 3 * len(samples) // 4):
+                slipped = os.path.join(tmp, "slipped.wav")
+                with wave.open(slipped, "w") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(profile.sample_rate)
+                    wf.writeframes(np.concatenate([samples[:position], samples[position + drop:]]).tobytes())
+                decoders = [("stream", decode_wav_to_file),
+                            ("parallel", partial(decode_wav_parallel, workers=2,
+                                                 segment_seconds=len(samples) / profile.sample_rate / 3))]
+                for name, decode in decoders:
+                    out = os.path.join(tmp, "out.bin")
+                    report = decode(slipped, out)
+                    ok = len(report.lost_frames) <= 1 and report.lost_frames != [report.total_frames - 1]
+                    rows.append((drop, position, name, ok, describe_report(report)))
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sstv_tab.fsk", description="FSK encode/decode without the GUI.")
+    parser.add_argument("action", choices=["encode", "decode", "check"])
+    parser.add_argument("input", nargs="?", help="input file; for decode, '-' reads raw s16le mono PCM from stdin")
+    parser.add_argument("output", nargs="?", help="output file; for decode, '-' writes to stdout")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(PROFILES), help="modulation profile for encode/check")
+    parser.add_argument("--rate", type=int, default=PROFILES[DEFAULT_PROFILE].sample_rate,
+                        help="sample rate of raw PCM on stdin")
+    parser.add_argument("--unframed", action="store_true", help="encode without CRC frames")
+    parser.add_argument("--workers", type=int, default=None, help="decode processes for framed WAVs (default: CPU cores)")
+    args = parser.parse_args(argv)
+
+    if args.action == "check":
+        rows = check_sample_slips(args.profile)
+        for drop, position, decoder, ok, report in rows:
+            print(f"{'OK  ' if ok else 'FAIL'} drop {drop} at {position:8d} {decoder:8s} {report}")
+        return 0 if all(row[3] for row in rows) else 1
+    if args.input is None or args.output is None:
+        parser.error(f"{args.action} needs input and output")
+    if args.action == "encode":
+        encode_file_to_wav(args.input, args.output, args.profile, framed=not args.unframed)
+        return 0
+    if args.input != "-" and args.output != "-":
+        report = decode_wav_parallel(args.input, args.output, args.workers)
+    elif args.input == "-":
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            report = decode_blocks(iter_pcm_blocks(sys.stdin.buffer), args.rate, out)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    else:
+        with wave.open(args.input, "r") as wf:
+            _check_pcm_format(wf)
+            report = decode_blocks(iter_wav_blocks(wf), wf.getframerate(), sys.stdout.buffer)
+    print(describe_report(report), file=sys.stderr)
+    return 1 if report.lost_frames else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
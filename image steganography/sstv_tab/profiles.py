@@ -0,0 +1,36 @@
+# sstv_tab/profiles.py
+# FSK profile table. Kept free of NumPy so the GUI can list profiles without loading the modem.
+
+import math
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class FSKProfile:
+    profile_id: int
+    name: str
+    sample_rate: int
+    symbol_samples: int
+    tones: tuple  # tone i carries symbol value i
+    description: str = ""
+
+    @property
+    def bits_per_symbol(self) -> int:
+        return int(math.log2(len(self.tones)))
+
+    @property
+    def bit_rate(self) -> float:
+        return self.sample_rate / self.symbol_samples * self.bits_per_symbol
+
+def _tones(first: int, step: int, count: int) -> tuple:
+    return tuple(first + step * i for i in range(count))
+
+# Tones sit on multiples of 1/symbol time, so they stay orthogonal over one symbol.
+PROFILES = {p.name: p for p in [
+    FSKProfile(0, "bfsk", 16000, 16, (1000, 2000), "2-FSK, 1 ms symbols, 1 kbit/s (original)"),
+    FSKProfile(1, "4fsk", 16000, 16, _tones(1000, 1000, 4), "4-FSK, 1 ms symbols, 2 kbit/s"),
+    FSKProfile(2, "16fsk", 48000, 48, _tones(1000, 1000, 16), "16-FSK, 1 ms symbols, 4 kbit/s"),
+    FSKProfile(3, "8fsk-fast", 48000, 24, _tones(2000, 2000, 8), "8-FSK, 0.5 ms symbols, 6 kbit/s"),
+    FSKProfile(4, "16fsk-fast", 96000, 48, _tones(2000, 2000, 16), "16-FSK, 0.5 ms symbols, 8 kbit/s"),
+]}
+PROFILES_BY_ID = {p.profile_id: p for p in PROFILES.values()}
+DEFAULT_PROFILE = "bfsk"
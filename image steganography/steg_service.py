@@ -0,0 +1,657 @@
+# steg_service.py
+# Local HTTP service around the steg and FSK engines, so other processes on this machine can
+# embed and decode without the Tk app. stdlib asyncio only; it listens on loopback addresses only.
+#
+#   python -m steg_service serve --port 8765
+#   curl --data-binary @cover.png "http://127.0.0.1:8765/embed?recipient=a@b.c&message=hi" -o stego.png
+#   curl --data-binary @stego.png http://127.0.0.1:8765/decode
+#   curl http://127.0.0.1:8765/metrics
+#   python -m steg_service load-test --requests 200 --concurrency 16
+#
+# Endpoints (POST bodies are the raw file, sent with Content-Length or chunked):
+#   POST /embed?recipient=..&message=..[&format=png][&bits=1][&alpha=0]  -> stego image
+#   POST /decode                                                        -> {"email": .., "message": ..}
+#   POST /sstv/encode[?profile=bfsk]                                    -> WAV
+#   POST /sstv/decode                                                   -> decoded file (report in X-Decode-Report)
+#   GET  /metrics, GET /health                                          -> JSON
+#
+# Uploads are spooled to a temp folder 64 KiB at a time and results are streamed back from
+# disk, so the service never holds a whole file in memory. Requests of one kind are micro-batched:
+# after the first arrives the batcher waits batch_window for more, then sends up to batch_size
+# of them to the process pool as one task; at most one batch per worker is in flight, and the
+# waiting requests are shared out between idle workers rather than piled into one batch.
+# Backpressure: a request is refused with 503 + Retry-After (before its body is read) when
+# max_queue requests are already uploading or waiting, or when its body would take the upload
+# bytes held by unfinished requests past max_inflight_bytes.
+
+import argparse
+import asyncio
+import collections
+import ipaddress
+import itertools
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+from sstv_tab.fsk import decode_wav_to_file, describe_report, encode_file_to_wav
+from sstv_tab.profiles import DEFAULT_PROFILE, PROFILES
+from steg_tab.output_formats import DEFAULT_OUTPUT_FORMAT, get_output_format
+from steg_tab.steg_crypto import decode_secret_payload, embed_secret_message_streaming
+
+CHUNK = 64 * 1024
+MAX_HEAD_BYTES = 64 * 1024  # request line + headers; long messages belong in the query, so be generous
+HEAD_TIMEOUT = 30.0  # seconds to wait for a request head on an open connection
+LINGER = 2.0  # seconds to discard an unread body after a refusal, so the client sees the response, not a reset
+RESERVOIR = 2048  # latest latencies kept per route for percentiles
+WINDOW = 60.0  # seconds of history behind the throughput figures
+
+ROUTES = {"/embed": "embed", "/decode": "decode", "/sstv/encode": "sstv_encode", "/sstv/decode": "sstv_decode"}
+REASONS = {100: "Continue", 200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Content Too Large", 422: "Unprocessable Content",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# ---------------------------------------------------------------- worker side (process pool)
+
+def _warm_worker() -> int:
+    return os.getpid()  # the first task in a fresh worker pays for importing the engines
+
+def _run_item(kind: str, item: dict):
+    if kind == "embed":
+        embed_secret_message_streaming(item["input"], item["output"], item["message"], item["recipient"],
+                                       bits_per_channel=item["bits"], use_alpha=item["alpha"],
+                                       output_format=item["format"])
+        return None
+    if kind == "decode":
+        return decode_secret_payload(item["input"])
+    if kind == "sstv_encode":
+        encode_file_to_wav(item["input"], item["output"], item["profile"])
+        return None
+    if kind == "sstv_decode":
+        return describe_report(decode_wav_to_file(item["input"], item["output"]))
+    raise ValueError(f"Unknown job kind {kind!r}.")
+
+def _run_batch(kind: str, items: list) -> list:
+    """Run a batch in one worker; returns (status, value, seconds) per item and never raises."""
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        try:
+            status, value = "ok", _run_item(kind, item)
+        except ValueError as e:  # bad input: no payload, image too small, ...
+            status, value = "invalid", str(e)
+        except Exception as e:
+            status, value = "error", f"{type(e).__name__}: {e}"
+        results.append((status, value, time.perf_counter() - start))
+    return results
+
+# ---------------------------------------------------------------- metrics
+
+def _percentiles(seconds) -> dict:
+    ordered = sorted(seconds)
+    if not ordered:
+        return {}
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 3)}
+
+class _RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.statuses = collections.Counter()
+        self.latency = collections.deque(maxlen=RESERVOIR)
+        self.queue_wait = collections.deque(maxlen=RESERVOIR)
+        self.work = collections.deque(maxlen=RESERVOIR)
+        self.recent = collections.deque()  # (finished at, bytes in + out)
+
+class ServiceMetrics:
+    """Per-route counts, latency/queue-wait/work percentiles and recent throughput."""
+    def __init__(self):
+        self.started = time.monotonic()
+        self.routes = collections.defaultdict(_RouteStats)
+        self.rejected = collections.Counter()  # reason -> requests refused by backpressure
+        self.batches = collections.Counter()  # kind -> batches dispatched
+        self.batched_items = collections.Counter()
+        self.largest_batch = collections.Counter()
+
+    def record(self, route: str, status: int, seconds: float, bytes_in: int = 0, bytes_out: int = 0,
+               queue_wait: float = None, work: float = None) -> None:
+        stats = self.routes[route]
+        stats.count += 1
+        stats.errors += status >= 500
+        stats.statuses[status] += 1
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.latency.append(seconds)
+        if queue_wait is not None:
+            stats.queue_wait.append(queue_wait)
+        if work is not None:
+            stats.work.append(work)
+        now = time.monotonic()
+        stats.recent.append((now, bytes_in + bytes_out))
+        while stats.recent and stats.recent[0][0] < now - WINDOW:
+            stats.recent.popleft()
+
+    def record_batch(self, kind: str, size: int) -> None:
+        self.batches[kind] += 1
+        self.batched_items[kind] += size
+        self.largest_batch[kind] = max(self.largest_batch[kind], size)
+
+    def snapshot(self, **gauges) -> dict:
+        now = time.monotonic()
+        span = max(min(WINDOW, now - self.started), 1e-9)
+        routes = {}
+        for route, s in sorted(self.routes.items()):
+            recent = [b for t, b in s.recent if t >= now - WINDOW]
+            routes[route] = {
+                "count": s.count, "errors": s.errors, "statuses": dict(s.statuses),
+                "bytes_in": s.bytes_in, "bytes_out": s.bytes_out,
+                "latency_ms": _percentiles(s.latency), "queue_wait_ms": _percentiles(s.queue_wait),
+                "work_ms": _percentiles(s.work),
+                "throughput": {"requests_per_s": round(len(recent) / span, 3),
+                               "mb_per_s": round(sum(recent) / span / 1e6, 3), "window_s": round(span, 1)},
+            }
+        batches = {kind: {"count": n, "mean_size": round(self.batched_items[kind] / n, 2),
+                          "max_size": self.largest_batch[kind]} for kind, n in self.batches.items()}
+        return dict(gauges, uptime_s=round(now - self.started, 1), routes=routes, batches=batches,
+                    rejected=dict(self.rejected))
+
+# ---------------------------------------------------------------- server side
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str, close: bool = False, retry_after: int = None):
+        super().__init__(message)
+        self.status = status
+        self.close = close  # the request body was not read, so the connection cannot be reused
+        self.retry_after = retry_after
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def _head(status: int, headers: dict, keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _parse_head(head: bytes):
+    try:
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise _HTTPError(400, "Malformed request line.", close=True)
+    headers = {}
+    for line in filter(None, header_lines):
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise _HTTPError(400, "Malformed header.", close=True)
+        headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    return method, url.path, parse_qs(url.query), version, headers
+
+class _Reservation:
+    """Upload bytes a request holds against max_inflight_bytes until it finishes."""
+    def __init__(self, service):
+        self.service = service
+        self.bytes = 0
+
+    def add(self, n: int) -> None:
+        if self.service.inflight_bytes + n > self.service.max_inflight_bytes:
+            self.service.metrics.rejected["inflight_bytes"] += 1
+            raise _HTTPError(503, "Too many upload bytes in flight; retry shortly.", close=True, retry_after=1)
+        self.service.inflight_bytes += n
+        self.bytes += n
+
+    def release(self) -> None:
+        self.service.inflight_bytes -= self.bytes
+        self.bytes = 0
+
+class _Batcher:
+    """Collects requests of one kind into batches and runs each batch as one pool task."""
+    def __init__(self, service, kind: str):
+        self.service = service
+        self.kind = kind
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: dict):
+        """(status, value, work seconds, queue-wait seconds) for one item, already counted in service.queued."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _run(self) -> None:
+        service = self.service
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() + 1 < service.batch_size and service.batch_window > 0:
+                await asyncio.sleep(service.batch_window)
+            await service.slots.acquire()
+            # a batch runs item after item in one worker, so split the waiting requests
+            # between the idle workers instead of handing them all to the first one
+            idle = service.workers - service.busy
+            size = min(service.batch_size, math.ceil((len(batch) + self.queue.qsize()) / idle))
+            while len(batch) < size:
+                batch.append(self.queue.get_nowait())
+            service.busy += 1
+            service.queued -= len(batch)
+            service.metrics.record_batch(self.kind, len(batch))
+            dispatched = time.perf_counter()
+            try:
+                work = loop.run_in_executor(service.pool, _run_batch, self.kind, [item for item, _, _ in batch])
+            except BrokenProcessPool as e:
+                service.busy -= 1
+                service.slots.release()
+                service.restart_pool()
+                self._resolve(batch, dispatched, [("error", f"Worker pool restarted: {e}", 0.0)] * len(batch))
+                continue
+            work.add_done_callback(partial(self._done, batch, dispatched))
+
+    def _done(self, batch: list, dispatched: float, work) -> None:
+        self.service.busy -= 1
+        self.service.slots.release()
+        try:
+            results = work.result()
+        except BaseException as e:  # a worker died (BrokenProcessPool) or the pool shut down
+            if isinstance(e, BrokenProcessPool):
+                self.service.restart_pool()
+            results = [("error", f"{type(e).__name__}: {e}", 0.0)] * len(batch)
+        self._resolve(batch, dispatched, results)
+
+    @staticmethod
+    def _resolve(batch: list, dispatched: float, results: list) -> None:
+        for (item, future, queued_at), (status, value, seconds) in zip(batch, results):
+            if not future.done():
+                future.set_result((status, value, seconds, dispatched - queued_at))
+
+class StegService:
+    """
+    The HTTP service. Use `await start()` / `await stop()` inside a running event loop;
+    port=0 picks a free port (see .port after start()).
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, workers: int = None, batch_size: int = 8,
+                 batch_window: float = 0.005, max_queue: int = 64, max_inflight_bytes: int = 512 << 20,
+                 max_body_bytes: int = 256 << 20):
+        if not _is_loopback(host):
+            raise ValueError("The service only listens on loopback addresses (127.0.0.1, ::1, localhost).")
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_body_bytes = max_body_bytes
+        self.metrics = ServiceMetrics()
+        self.queued = 0  # requests accepted but not yet sent to a worker (uploading or waiting)
+        self.busy = 0  # batches running in the pool
+        self.inflight_bytes = 0
+        self.active = 0  # requests between head and response
+        self.pool = None
+        self.slots = None
+        self._server = None
+        self._batchers = {}
+        self._tmp = None
+        self._ids = itertools.count(1)
+
+    async def start(self) -> None:
+        self._tmp = tempfile.mkdtemp(prefix="steg-service-")
+        self.slots = asyncio.Semaphore(self.workers)
+        self.restart_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, _warm_worker) for _ in range(self.workers)])
+        self._batchers = {kind: _Batcher(self, kind) for kind in ROUTES.values()}
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEAD_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def restart_pool(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self._batchers.values():
+            batcher.task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._tmp:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+    @property
+    def url(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"http://{host}:{self.port}"
+
+    def metrics_snapshot(self) -> dict:
+        return self.metrics.snapshot(
+            queue_depth=self.queued, active_requests=self.active, inflight_bytes=self.inflight_bytes,
+            limits={"workers": self.workers, "batch_size": self.batch_size,
+                    "batch_window_ms": self.batch_window * 1000, "max_queue": self.max_queue,
+                    "max_inflight_bytes": self.max_inflight_bytes, "max_body_bytes": self.max_body_bytes})
+
+    # connection handling
+
+    async def _handle_connection(self, reader, writer) -> None:
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            await self._linger(reader, writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    @staticmethod
+    async def _linger(reader, writer) -> None:
+        """Half-close, then read and drop whatever the client still sends until it closes too."""
+        try:
+            if writer.is_closing() or not writer.can_write_eof():
+                return
+            writer.write_eof()
+            deadline = time.monotonic() + LINGER
+            while time.monotonic() < deadline and await asyncio.wait_for(reader.read(CHUNK), deadline - time.monotonic()):
+                pass
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            pass
+
+    async def _handle_request(self, reader, writer) -> bool:
+        """Serve one request; returns whether the connection can take another."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEAD_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return False  # client closed between requests
+        except asyncio.LimitOverrunError:
+            await self._send_json(writer, 431, {"error": "Request head too large."}, False)
+            return False
+
+        started = time.perf_counter()
+        self.active += 1
+        route, status, counts = "other", 500, {}
+        keep_alive = False
+        try:
+            method, path, query, version, headers = _parse_head(head)
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            route = path if path in ROUTES or path in ("/metrics", "/health") else "other"
+            if path in ROUTES:
+                if method != "POST":
+                    raise _HTTPError(405, "Use POST.", close="content-length" in headers or "transfer-encoding" in headers)
+                status, counts = await self._handle_job(ROUTES[path], query, headers, reader, writer, keep_alive)
+            elif path in ("/metrics", "/health") and method == "GET":
+                body = self.metrics_snapshot() if path == "/metrics" else {"ok": True, "workers": self.workers}
+                status, counts["bytes_out"] = 200, await self._send_json(writer, 200, body, keep_alive)
+            else:
+                raise _HTTPError(404 if route == "other" else 405, "No such endpoint." if route == "other" else "Use GET.")
+        except _HTTPError as e:
+            keep_alive = keep_alive and not e.close
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after else {}
+            status = e.status
+            counts["bytes_out"] = await self._send_json(writer, status, {"error": str(e)}, keep_alive, headers)
+        finally:
+            self.active -= 1
+            self.metrics.record(route, status, time.perf_counter() - started, **counts)
+        return keep_alive
+
+    def _params(self, kind: str, query: dict) -> dict:
+        get = lambda name, default=None: query.get(name, [default])[0]
+        try:
+            if kind == "embed":
+                if get("recipient") is None or get("message") is None:
+                    raise ValueError("recipient and message are required.")
+                bits = int(get("bits", "1"))
+                if not 1 <= bits <= 4:
+                    raise ValueError("bits must be between 1 and 4.")
+                return {"recipient": get("recipient"), "message": get("message"), "bits": bits,
+                        "alpha": get("alpha", "0") not in ("0", "false", ""),
+                        "format": get_output_format(get("format", DEFAULT_OUTPUT_FORMAT)).name}
+            if kind == "sstv_encode":
+                profile = get("profile", DEFAULT_PROFILE)
+                if profile not in PROFILES:
+                    raise ValueError(f"Unknown FSK profile {profile!r}; choose from {', '.join(PROFILES)}.")
+                return {"profile": profile}
+            return {}
+        except ValueError as e:
+            raise _HTTPError(400, str(e), close=True)
+
+    async def _handle_job(self, kind: str, query: dict, headers: dict, reader, writer, keep_alive: bool):
+        params = self._params(kind, query)
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        if length is None and not chunked:
+            raise _HTTPError(411, "Send the file with Content-Length or chunked encoding.", close=True)
+        try:
+            length = None if chunked else int(length)
+        except ValueError:
+            raise _HTTPError(400, "Bad Content-Length.", close=True)
+        if length is not None and length > self.max_body_bytes:
+            raise _HTTPError(413, f"Body larger than {self.max_body_bytes} bytes.", close=True)
+        if self.queued >= self.max_queue:
+            self.metrics.rejected["queue"] += 1
+            raise _HTTPError(503, "Queue full; retry shortly.", close=True, retry_after=1)
+
+        self.queued += 1  # the batcher takes it off when the request goes to a worker
+        submitted = False
+        reservation = _Reservation(self)
+        request_id = next(self._ids)
+        input_path = os.path.join(self._tmp, f"{request_id}.in")
+        output_path = os.path.join(self._tmp, f"{request_id}.out")
+        try:
+            if length is not None:
+                reservation.add(length)
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            bytes_in = await self._spool_body(reader, input_path, length, reservation)
+            submitted = True
+            status, value, work, queue_wait = await self._batchers[kind].submit(
+                dict(params, input=input_path, output=output_path))
+            counts = {"bytes_in": bytes_in, "queue_wait": queue_wait, "work": work}
+            if status == "invalid":
+                raise _HTTPError(422, value)
+            if status == "error":
+                raise _HTTPError(500, value)
+            if kind == "decode":
+                counts["bytes_out"] = await self._send_json(writer, 200, value, keep_alive)
+            elif kind == "embed":
+                content_type = f"image/{get_output_format(params['format']).format.lower()}"
+                counts["bytes_out"] = await self._send_file(writer, output_path, content_type, keep_alive)
+            elif kind == "sstv_encode":
+                counts["bytes_out"] = await self._send_file(writer, output_path, "audio/wav", keep_alive)
+            else:
+                counts["bytes_out"] = await self._send_file(writer, output_path, "application/octet-stream",
+                                                            keep_alive, {"X-Decode-Report": value})
+            return 200, counts
+        finally:
+            if not submitted:
+                self.queued -= 1
+            reservation.release()
+            for path in (input_path, output_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def _spool_body(self, reader, path: str, length, reservation: _Reservation) -> int:
+        received = 0
+        with open(path, "wb") as f:
+            if length is not None:
+                while received < length:
+                    data = await reader.read(min(CHUNK, length - received))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b"", length - received)
+                    f.write(data)
+                    received += len(data)
+                return received
+            while True:
+                size_line = await reader.readline()
+                try:
+                    size = int(size_line.split(b";")[0], 16)
+                except ValueError:
+                    raise _HTTPError(400, "Bad chunk size.", close=True)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    return received
+                if received + size > self.max_body_bytes:
+                    raise _HTTPError(413, f"Body larger than {self.max_body_bytes} bytes.", close=True)
+                reservation.add(size)
+                f.write(await reader.readexactly(size))
+                await reader.readexactly(2)  # CRLF after the chunk
+                received += size
+
+    async def _send_json(self, writer, status: int, body: dict, keep_alive: bool, headers: dict = None) -> int:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        head = dict(headers or {}, **{"Content-Type": "application/json", "Content-Length": len(data)})
+        writer.write(_head(status, head, keep_alive) + data)
+        await writer.drain()
+        return len(data)
+
+    async def _send_file(self, writer, path: str, content_type: str, keep_alive: bool, headers: dict = None) -> int:
+        size = os.path.getsize(path)
+        head = dict(headers or {}, **{"Content-Type": content_type, "Content-Length": size})
+        writer.write(_head(200, head, keep_alive))
+        with open(path, "rb") as f:
+            for data in iter(lambda: f.read(CHUNK), b""):
+                writer.write(data)
+                await writer.drain()  # waits for slow clients instead of buffering the file
+        return size
+
+# ---------------------------------------------------------------- client and load test
+
+async def request(url: str, method: str = "GET", body_path: str = None, timeout: float = 120.0):
+    """Minimal client for this service: (status, headers, body bytes). The upload is streamed from body_path."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        size = os.path.getsize(body_path) if body_path else 0
+        writer.write(f"{method} {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Length: {size}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1"))
+        if body_path:
+            with open(body_path, "rb") as f:
+                for data in iter(lambda: f.read(CHUNK), b""):
+                    writer.write(data)
+                    await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split(" ")[1]), headers, body
+    finally:
+        writer.close()
+
+def _load_test_inputs(work_dir: str, size) -> dict:
+    import numpy as np
+    from PIL import Image
+
+    from steg_tab.steg_crypto import embed_secret_message
+
+    cover = os.path.join(work_dir, "cover.png")
+    gradient = np.add.outer(np.linspace(0, 120, size[1]), np.linspace(0, 120, size[0])).astype(np.uint8)
+    pixels = np.repeat(gradient[:, :, None], 3, axis=2) + np.random.default_rng(1).integers(0, 16, (size[1], size[0], 3), dtype=np.uint8)
+    Image.fromarray(pixels, "RGB").save(cover, compress_level=1)
+    stego = os.path.join(work_dir, "stego.png")
+    embed_secret_message(cover, stego, "load test", "load@example.com")
+    return {"cover": cover, "stego": stego}
+
+async def load_test(requests: int = 200, concurrency: int = 16, kind: str = "decode", size=(640, 480),
+                    **service_options) -> dict:
+    """Start a service on a free loopback port, send requests concurrently and return the metrics."""
+    service = StegService(port=0, **service_options)
+    await service.start()
+    with tempfile.TemporaryDirectory(prefix="steg-service-load-") as work_dir:
+        inputs = _load_test_inputs(work_dir, size)
+        if kind == "embed":
+            url, body = f"{service.url}/embed?recipient=load%40example.com&message=hello&format=png-fast", inputs["cover"]
+        else:
+            url, body = f"{service.url}/decode", inputs["stego"]
+        gate = asyncio.Semaphore(concurrency)
+        statuses = collections.Counter()
+
+        async def one():
+            async with gate:
+                try:
+                    status, _, _ = await request(url, "POST", body)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    status = "reset"
+                statuses[status] += 1
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*[one() for _ in range(requests)])
+        finally:
+            seconds = time.perf_counter() - start
+            metrics = service.metrics_snapshot()
+            await service.stop()
+    return {"requests": requests, "seconds": round(seconds, 3), "requests_per_s": round(requests / seconds, 1),
+            "statuses": dict(statuses), "metrics": metrics}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m steg_service", description="Local HTTP embed/decode service.")
+    parser.add_argument("action", choices=["serve", "load-test"])
+    parser.add_argument("--host", default="127.0.0.1", help="loopback address to listen on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU cores)")
+    parser.add_argument("--batch-size", type=int, default=8, help="most requests per batch")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0, help="wait for a batch to fill (ms)")
+    parser.add_argument("--max-queue", type=int, default=64, help="waiting requests before 503s")
+    parser.add_argument("--max-inflight-mb", type=float, default=512, help="upload MB held before 503s")
+    parser.add_argument("--max-body-mb", type=float, default=256, help="largest accepted upload (MB)")
+    parser.add_argument("--requests", type=int, default=200, help="load-test: requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="load-test: requests in flight")
+    parser.add_argument("--kind", choices=["decode", "embed"], default="decode", help="load-test: endpoint")
+    args = parser.parse_args(argv)
+
+    options = {"workers": args.workers, "batch_size": args.batch_size, "batch_window": args.batch_window_ms / 1000,
+               "max_queue": args.max_queue, "max_inflight_bytes": int(args.max_inflight_mb * 2**20),
+               "max_body_bytes": int(args.max_body_mb * 2**20)}
+    if args.action == "load-test":
+        print(json.dumps(asyncio.run(load_test(args.requests, args.concurrency, args.kind, **options)), indent=2))
+        return 0
+
+    try:
+        service = StegService(args.host, args.port, **options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    async def run():
+        await service.start()
+        print(f"Serving on {service.url} (workers={service.workers})", file=sys.stderr)
+        try:
+            await service._server.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# steg_tab/batch.py
+# Headless batch embed/decode across a process pool (no Tk required).
+#
+#   python -m steg_tab.batch decode ./inbox
+#   python -m steg_tab.batch embed --manifest jobs.csv --out-dir ./out
+#   python -m steg_tab.batch embed ./covers --message "hi" --recipient a@b.c
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+
+from instrumentation import captured
+
+from .output_formats import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, get_output_format
+from .steg_crypto import embed_secret_message, embed_secret_message_streaming, decode_secret_payload
+
+IMAGE_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".jpg", ".jpeg", ".webp")
+STEGO_SUFFIX = "_stego"  # default output name: <cover>_stego.<ext>
+
+@dataclass
+class Job:
+    action: str  # "embed" or "decode"
+    cover: str
+    message: str = None
+    recipient: str = None
+    output: str = None
+    streaming: bool = False
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+
+@dataclass
+class JobResult:
+    job: Job
+    ok: bool
+    seconds: float
+    input_bytes: int = 0
+    payload: dict = None
+    error: str = None
+
+@dataclass
+class BatchReport:
+    results: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def files_per_second(self):
+        return len(self.results) / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return sum(r.input_bytes for r in self.results) / self.seconds if self.seconds else 0.0
+
+def default_output_path(cover: str, out_dir: str = None, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    stem = os.path.splitext(os.path.basename(cover))[0]
+    return os.path.join(out_dir or os.path.dirname(cover), f"{stem}{STEGO_SUFFIX}{get_output_format(output_format).extension}")
+
+def jobs_from_directory(directory: str, action: str, message: str = None, recipient: str = None,
+                        out_dir: str = None, streaming: bool = False,
+                        output_format: str = DEFAULT_OUTPUT_FORMAT) -> list:
+    """
+    One job per image file in directory (non-recursive, sorted by name). When embedding,
+    earlier outputs (*_stego.<ext>) are skipped, so a rerun does not embed into them again.
+    """
+    jobs = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if action == "embed" and os.path.splitext(name)[0].endswith(STEGO_SUFFIX):
+            continue
+        output = default_output_path(path, out_dir, output_format) if action == "embed" else None
+        jobs.append(Job(action, path, message, recipient, output, streaming, output_format))
+    return jobs
+
+def load_manifest(manifest_path: str, action: str, out_dir: str = None, streaming: bool = False,
+                  output_format: str = DEFAULT_OUTPUT_FORMAT) -> list:
+    """
+    Read jobs from a CSV (header row) or JSONL manifest with fields cover, message, recipient
+    and optional output and format (overriding output_format for that row). Relative
+    cover/output paths are resolved against the manifest's folder.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        if manifest_path.lower().endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for n, row in enumerate(rows, start=1):
+        if not row.get("cover"):
+            raise ValueError(f"Manifest row {n} has no cover path.")
+        cover = os.path.join(base, row["cover"])
+        output = row.get("output")
+        row_format = row.get("format") or output_format
+        if action == "embed":
+            output = os.path.join(base, output) if output else default_output_path(cover, out_dir, row_format)
+        jobs.append(Job(action, cover, row.get("message"), row.get("recipient"), output, streaming, row_format))
+    return jobs
+
+def run_job(job: Job, profile_dir: str = None, trace_memory: bool = False) -> JobResult:
+    """
+    Run a single job in the current process; errors are captured in the result.
+    With profile_dir, the job is captured with cProfile (and tracemalloc if trace_memory) there.
+    """
+    start = time.perf_counter()
+    input_bytes = 0
+    try:
+        input_bytes = os.path.getsize(job.cover)
+        if job.action == "embed":
+            fn = embed_secret_message_streaming if job.streaming else embed_secret_message
+            fn = partial(fn, output_format=job.output_format)
+            args = (job.cover, job.output, job.message, job.recipient)
+        elif job.action == "decode":
+            fn, args = decode_secret_payload, (job.cover,)
+        else:
+            raise ValueError(f"Unknown action: {job.action}")
+        if profile_dir:
+            fn = captured(fn, f"{job.action}-{os.path.basename(job.cover)}", profile_dir, trace_memory)
+        result = fn(*args)
+        payload = result if job.action == "decode" else None
+        return JobResult(job, True, time.perf_counter() - start, input_bytes, payload)
+    except Exception as e:
+        return JobResult(job, False, time.perf_counter() - start, input_bytes, error=str(e))
+
+def run_jobs(jobs: list, workers: int = None, on_result=None, profile_dir: str = None,
+             trace_memory: bool = False) -> BatchReport:
+    """
+    Run jobs across a ProcessPoolExecutor (defaults to one worker per core).
+    on_result(result) is called in the parent as each job finishes; results keep job order.
+    profile_dir/trace_memory are passed to run_job for per-job profiling.
+    """
+    workers = workers or os.cpu_count() or 1
+    report = BatchReport()
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            result = run_job(job, profile_dir, trace_memory)
+            report.results.append(result)
+            if on_result:
+                on_result(result)
+    else:
+        by_index = {}
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {pool.submit(run_job, job, profile_dir, trace_memory): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                result = future.result()
+                by_index[futures[future]] = result
+                if on_result:
+                    on_result(result)
+        report.results = [by_index[i] for i in range(len(jobs))]
+    report.seconds = time.perf_counter() - start
+    return report
+
+def _print_result(result: JobResult, as_json: bool, show_message: bool = False) -> None:
+    """One line per job; decoded messages are printed only with show_message, in either mode."""
+    job = result.job
+    payload = result.payload if isinstance(result.payload, dict) else {}
+    if as_json:
+        line = {"action": job.action, "cover": job.cover, "output": job.output, "ok": result.ok,
+                "seconds": round(result.seconds, 4), "recipient": payload.get("email"), "error": result.error}
+        if show_message:
+            line["message"] = payload.get("message")
+        print(json.dumps(line, ensure_ascii=False), flush=True)
+        return
+    status = "OK  " if result.ok else "FAIL"
+    if not result.ok:
+        detail = result.error
+    elif job.action == "embed":
+        detail = f"-> {job.output}"
+    else:
+        detail = f"recipient={payload.get('email')}"
+    print(f"{status} {job.cover} {detail} ({result.seconds:.2f}s)", flush=True)
+    if show_message and result.ok and job.action == "decode":
+        print(payload.get("message"), flush=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m steg_tab.batch",
+                                     description="Batch LSB embed/decode without the GUI.")
+    parser.add_argument("action", choices=["embed", "decode"])
+    parser.add_argument("directory", nargs="?", help="folder of images (alternative to --manifest)")
+    parser.add_argument("--manifest", help="CSV or JSONL with cover, message, recipient[, output, format]")
+    parser.add_argument("--message", help="message for every cover when embedding a directory")
+    parser.add_argument("--recipient", help="recipient email for every cover when embedding a directory")
+    parser.add_argument("--out-dir", help="where stego images go (default: next to each cover)")
+    parser.add_argument("--streaming", action="store_true", help="use strip-based embedding for large covers")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT,
+                        help="output format for stego images (png-fast, webp and tiff encode faster)")
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: CPU cores)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per file")
+    parser.add_argument("--show-message", action="store_true",
+                        help="also print decoded messages (by default only the recipient is shown)")
+    parser.add_argument("--profile-dir", help="write a cProfile capture per job into this folder")
+    parser.add_argument("--trace-memory", action="store_true", help="with --profile-dir, also record tracemalloc peaks")
+    args = parser.parse_args(argv)
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("give either a directory or --manifest")
+    if args.manifest:
+        jobs = load_manifest(args.manifest, args.action, args.out_dir, args.streaming, args.format)
+    else:
+        if args.action == "embed" and (args.message is None or not args.recipient):
+            parser.error("embedding a directory needs --message and --recipient")
+        jobs = jobs_from_directory(args.directory, args.action, args.message, args.recipient,
+                                   args.out_dir, args.streaming, args.format)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    report = run_jobs(jobs, args.workers, on_result=lambda r: _print_result(r, args.json, args.show_message),
+                      profile_dir=args.profile_dir, trace_memory=args.trace_memory)
+    summary = (f"{len(report.results)} files, {len(report.failed)} failed in {report.seconds:.2f}s "
+               f"({report.files_per_second:.1f} files/s, {report.bytes_per_second / 1e6:.1f} MB/s)")
+    print(summary, file=sys.stderr)
+    return 1 if report.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# steg_tab/inbox_index.py
+# Persistent index of a drop folder: which images carry a payload, and for whom.
+#
+# Files are screened from their first 16 pixels (payload length, lead byte and flags must be
+# plausible, see read_payload_header), so ordinary photos cost one short row decode: they are
+# neither hashed nor walked, and are recorded by (path, size, mtime) alone. Only images that pass
+# are hashed and extracted, to record the recipient; message text is never stored. For those the
+# SQLite index maps (path, size, mtime) to a SHA-256 content hash and the hash to the result, so
+# copies of a known stego image are not extracted again. A rescan only looks at files that are
+# new or changed. Parts of a multi-image message get their recipient once every part is indexed.
+#
+#   python -m steg_tab.inbox_index scan drop/ --recursive
+#   python -m steg_tab.inbox_index find drop/ alice@example.com
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .output_formats import OUTPUT_FORMATS
+from .payload_cache import hash_file
+from .payload_format import CONTAINER_SHARD, unpack_shard
+from .shards import join_shards
+from .steg_crypto import extract_payload_bytes, parse_payload, read_payload_header
+
+INDEX_NAME = ".steg_inbox.sqlite"
+SCHEMA_VERSION = 2  # older index files are rebuilt; the index only caches what the folder holds
+IMAGE_EXTENSIONS = frozenset({f.extension for f in OUTPUT_FORMATS.values()} | {".tiff"})
+COMMIT_EVERY = 200  # files per transaction, so an interrupted scan keeps its progress
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest BLOB  -- NULL: screened out by the header check, never hashed
+);
+CREATE INDEX IF NOT EXISTS files_digest ON files(digest);
+CREATE TABLE IF NOT EXISTS contents (
+    digest BLOB PRIMARY KEY,
+    kind TEXT NOT NULL,  -- none, message, shard or invalid
+    email TEXT,
+    email_key TEXT,  -- lower-cased email, for lookups
+    message_id TEXT,  -- shards only
+    part INTEGER,
+    total INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS contents_email ON contents(email_key);
+CREATE INDEX IF NOT EXISTS contents_message ON contents(message_id);
+"""
+
+def classify(path: str) -> dict:
+    """Screen one image and, if it carries a payload, read its recipient (or its shard header)."""
+    try:
+        header = read_payload_header(path)
+    except (ValueError, OSError):  # no payload, or not an image PIL can open
+        return {"kind": "none"}
+    try:
+        payload = extract_payload_bytes(path)
+        if header["lead"] == CONTAINER_SHARD:
+            shard = unpack_shard(payload)
+            return {"kind": "shard", "message_id": shard.message_id.hex(), "part": shard.index, "total": shard.total}
+        return {"kind": "message", "email": parse_payload(payload)["email"]}
+    except (ValueError, OSError) as e:  # a lucky false positive, or a damaged stego image
+        return {"kind": "invalid", "error": str(e)}
+
+def _screen_and_hash(path: str):
+    """(path, size, mtime_ns, digest); digest is None when the header check rejects the file."""
+    try:
+        st = os.stat(path)
+        try:
+            read_payload_header(path)
+        except (ValueError, OSError):  # no payload, or not an image PIL can open
+            return path, st.st_size, st.st_mtime_ns, None
+        return path, st.st_size, st.st_mtime_ns, hash_file(path)
+    except OSError:  # removed or unreadable since the folder was listed
+        return None
+
+def iter_images(folder: str, recursive: bool = False):
+    """Absolute paths of files in folder with a stego image extension."""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from iter_images(entry.path, recursive)
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.abspath(entry.path)
+
+class InboxIndex:
+    """SQLite-backed index of stego images by recipient. Use from one thread."""
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS contents;")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def for_folder(cls, folder: str) -> "InboxIndex":
+        return cls(os.path.join(folder, INDEX_NAME))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def scan(self, folder: str, recursive: bool = False, workers: int = None, progress=None) -> dict:
+        """
+        Bring the index up to date with folder: screen new or changed files from their header
+        pixels, hash and extract the few that pass (unless their content is already indexed),
+        and drop files that are gone. Screening, hashing and extraction run on a thread pool.
+        progress(done, total) is called as new or changed files are screened. Returns counts.
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(folder)
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self._db.execute("SELECT path, size, mtime_ns FROM files")}
+        paths = list(iter_images(root, recursive))
+        changed = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                changed.append(path)
+        counts = {"files": len(paths), "unchanged": len(paths) - len(changed), "screened": 0, "hashed": 0,
+                  "extracted": 0, "payloads": 0, "removed": 0, "resolved": 0}
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            extracting = {}  # digest -> future, so copies within one scan are extracted once
+            rows = []
+            for row in pool.map(_screen_and_hash, changed):
+                counts["screened"] += 1
+                if row is not None:
+                    rows.append(row)
+                    digest = row[3]
+                    if digest is not None:
+                        counts["hashed"] += 1
+                        if digest not in extracting and not self._has_content(digest):
+                            extracting[digest] = pool.submit(classify, row[0])
+                if progress:
+                    progress(counts["screened"], len(changed))
+            for done, (digest, future) in enumerate(extracting.items(), start=1):
+                result = future.result()
+                counts["extracted"] += 1
+                counts["payloads"] += result["kind"] in ("message", "shard")
+                self._store(digest, result)
+                if done % COMMIT_EVERY == 0:
+                    self._db.commit()
+            self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", rows)
+
+        seen = set(paths)
+        gone = [(path,) for path in known if path not in seen and self._under(path, root, recursive)]
+        self._db.executemany("DELETE FROM files WHERE path = ?", gone)
+        self._db.execute("DELETE FROM contents WHERE digest NOT IN "
+                         "(SELECT digest FROM files WHERE digest IS NOT NULL)")
+        # a multi-image message that lost a part is no longer listed under its recipient
+        self._db.execute(
+            "UPDATE contents SET email = NULL, email_key = NULL WHERE kind = 'shard' AND message_id IN "
+            "(SELECT message_id FROM contents WHERE kind = 'shard' GROUP BY message_id "
+            "HAVING COUNT(DISTINCT part) < MAX(total))")
+        counts["removed"] = len(gone)
+        self._db.commit()
+        counts["resolved"] = self._resolve_shards()
+        counts["seconds"] = round(time.perf_counter() - start, 4)
+        return counts
+
+    @staticmethod
+    def _under(path: str, root: str, recursive: bool) -> bool:
+        if recursive:
+            return path.startswith(os.path.join(root, ""))
+        return os.path.dirname(path) == root
+
+    def _has_content(self, digest: bytes) -> bool:
+        return self._db.execute("SELECT 1 FROM contents WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def _store(self, digest: bytes, result: dict) -> None:
+        email = result.get("email")
+        self._db.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (digest, result["kind"], email, email.lower() if email is not None else None,
+                          result.get("message_id"), result.get("part"), result.get("total"), result.get("error")))
+
+    def _resolve_shards(self) -> int:
+        """Join multi-image messages whose parts are all indexed, to record their recipient."""
+        complete = self._db.execute(
+            "SELECT message_id FROM contents WHERE kind = 'shard' AND email IS NULL "
+            "GROUP BY message_id HAVING COUNT(DISTINCT part) = MAX(total)").fetchall()
+        resolved = 0
+        for (message_id,) in complete:
+            paths = [path for (path,) in self._db.execute(
+                "SELECT MIN(f.path) FROM contents c JOIN files f ON f.digest = c.digest "
+                "WHERE c.message_id = ? GROUP BY c.part", (message_id,))]
+            try:
+                email = parse_payload(join_shards([extract_payload_bytes(path) for path in paths], paths))["email"]
+            except (ValueError, OSError) as e:
+                self._db.execute("UPDATE contents SET error = ? WHERE message_id = ?", (str(e), message_id))
+                continue
+            self._db.execute("UPDATE contents SET email = ?, email_key = ? WHERE message_id = ?",
+                             (email, email.lower(), message_id))
+            resolved += 1
+        self._db.commit()
+        return resolved
+
+    def find(self, recipient_email: str) -> list:
+        """Indexed images addressed to recipient_email (case-insensitive), as dicts sorted by path."""
+        rows = self._db.execute(
+            "SELECT f.path, c.kind, c.message_id, c.part, c.total FROM contents c "
+            "JOIN files f ON f.digest = c.digest WHERE c.email_key = ? ORDER BY f.path",
+            (recipient_email.lower(),))
+        return [{"path": path, "kind": kind, "message_id": message_id,
+                 "part": None if part is None else part + 1, "total": total}
+                for path, kind, message_id, part, total in rows]
+
+    def recipients(self) -> dict:
+        """Recipient email -> number of indexed images addressed to it."""
+        return dict(self._db.execute(
+            "SELECT c.email, COUNT(*) FROM contents c JOIN files f ON f.digest = c.digest "
+            "WHERE c.email IS NOT NULL GROUP BY c.email_key ORDER BY c.email"))
+
+    def summary(self) -> dict:
+        """Indexed files per kind (none, message, shard, invalid)."""
+        return dict(self._db.execute(
+            "SELECT COALESCE(c.kind, 'none') AS kind, COUNT(*) FROM files f "
+            "LEFT JOIN contents c ON c.digest = f.digest GROUP BY kind"))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m steg_tab.inbox_index",
+                                     description="Index a drop folder of images by payload recipient.")
+    parser.add_argument("action", choices=["scan", "find", "list"])
+    parser.add_argument("folder", help="drop folder (the index lives inside it unless --db is given)")
+    parser.add_argument("recipient", nargs="?", help="find: recipient email")
+    parser.add_argument("--db", help=f"index file (default: <folder>/{INDEX_NAME})")
+    parser.add_argument("--recursive", action="store_true", help="scan: include subfolders")
+    parser.add_argument("--workers", type=int, default=None, help="scan: threads (default: CPU cores)")
+    parser.add_argument("--no-scan", action="store_true", help="find/list: use the index as it is")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+    if (args.action == "find") != (args.recipient is not None):
+        parser.error("find takes a recipient email; scan and list do not")
+
+    with InboxIndex(args.db) if args.db else InboxIndex.for_folder(args.folder) as index:
+        counts = None
+        if args.action == "scan" or not args.no_scan:
+            counts = index.scan(args.folder, args.recursive, args.workers)
+        if args.action == "scan":
+            result = dict(counts, kinds=index.summary())
+            text = (f"{counts['files']} files: {counts['unchanged']} unchanged, {counts['screened']} screened, "
+                    f"{counts['hashed']} hashed, {counts['extracted']} extracted, {counts['payloads']} with a "
+                    f"payload, {counts['removed']} removed ({counts['seconds']:.2f}s)")
+        elif args.action == "find":
+            result = index.find(args.recipient)
+            text = "\n".join(row["path"] + (f"  (part {row['part']} of {row['total']})" if row["kind"] == "shard" else "")
+                             for row in result) or f"No images for {args.recipient}."
+        else:
+            result = index.recipients()
+            text = "\n".join(f"{count:6d}  {email}" for email, count in result.items()) or "No payloads indexed."
+    print(json.dumps(result) if args.json else text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
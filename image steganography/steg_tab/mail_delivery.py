@@ -0,0 +1,438 @@
+# steg_tab/mail_delivery.py
+# OTP mail delivery: a pool of long-lived SMTP connections fed by an asyncio send queue.
+#
+# Configuration comes from STEG_SMTP_* environment variables, optionally on top of a JSON file
+# named by STEG_SMTP_CONFIG (keys are the SMTPConfig field names):
+#   STEG_SMTP_HOST, STEG_SMTP_PORT, STEG_SMTP_USERNAME, STEG_SMTP_PASSWORD,
+#   STEG_SMTP_SECURITY (ssl | starttls | none), STEG_SMTP_SENDER, STEG_SMTP_POOL_SIZE
+#
+# Offline load test against a local aiosmtpd stand-in (pip install aiosmtpd):
+#   python -m steg_tab.mail_delivery --local --count 500 --server-delay 0.02
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import random
+import smtplib
+import socket
+import ssl
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, fields, replace
+from email.message import EmailMessage
+
+SECURITY_MODES = ("ssl", "starttls", "none")
+HEALTH_CHECK_AFTER = 5.0  # seconds idle before a pooled connection is NOOP-checked
+MAX_CONNECTION_AGE = 600.0
+MAX_IDLE = 120.0  # providers drop idle sessions; reconnecting beats a failed send
+
+@dataclass(frozen=True)
+class SMTPConfig:
+    host: str = "smtp.gmail.com"
+    port: int = 465
+    username: str = ""
+    password: str = ""
+    security: str = "ssl"
+    sender: str = ""  # From address; defaults to username
+    timeout: float = 30.0
+    pool_size: int = 2
+    max_attempts: int = 4
+
+    @property
+    def from_address(self) -> str:
+        return self.sender or self.username
+
+    @classmethod
+    def from_env(cls, environ=None) -> "SMTPConfig":
+        environ = os.environ if environ is None else environ
+        values = {}
+        path = environ.get("STEG_SMTP_CONFIG")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                values.update(json.load(f))
+        for f in fields(cls):
+            raw = environ.get(f"STEG_SMTP_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = raw
+        config = cls()
+        for f in fields(cls):
+            if f.name in values:
+                kind = type(getattr(config, f.name))
+                try:
+                    config = replace(config, **{f.name: kind(values[f.name])})
+                except ValueError:
+                    raise ValueError(f"SMTP setting {f.name} must be {kind.__name__}.") from None
+        if config.security not in SECURITY_MODES:
+            raise ValueError(f"SMTP security must be one of {', '.join(SECURITY_MODES)}.")
+        return config
+
+def is_transient(exc: BaseException) -> bool:
+    """True if a send failure is worth retrying (4xx replies, dropped or refused connections)."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    return isinstance(exc, OSError)
+
+class _PooledConnection:
+    __slots__ = ("smtp", "created", "last_used")
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created = self.last_used = time.monotonic()
+
+class SMTPConnectionPool:
+    """
+    Up to config.pool_size logged-in SMTP sessions shared between threads. A session that sat
+    idle is NOOP-checked before reuse; stale, old or failed sessions are closed and replaced.
+    """
+    def __init__(self, config: SMTPConfig):
+        if config.security not in SECURITY_MODES:
+            raise ValueError(f"SMTP security must be one of {', '.join(SECURITY_MODES)}.")
+        self.config = config
+        self.stats = {"connects": 0, "reuses": 0, "discarded": 0}
+        self._slots = threading.BoundedSemaphore(max(config.pool_size, 1))
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> _PooledConnection:
+        cfg = self.config
+        if cfg.security == "ssl":
+            smtp = smtplib.SMTP_SSL(cfg.host, cfg.port, timeout=cfg.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout)
+        try:
+            if cfg.security == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+            if cfg.username:
+                smtp.login(cfg.username, cfg.password)
+        except BaseException:
+            self._quit(smtp)
+            raise
+        with self._lock:
+            self.stats["connects"] += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _quit(smtp) -> None:
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _usable(self, conn: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - conn.created > MAX_CONNECTION_AGE or now - conn.last_used > MAX_IDLE:
+            return False
+        if now - conn.last_used < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _discard(self, conn: _PooledConnection) -> None:
+        with self._lock:
+            self.stats["discarded"] += 1
+        self._quit(conn.smtp)
+
+    def _acquire(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("SMTP pool is closed.")
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._usable(conn):
+                with self._lock:
+                    self.stats["reuses"] += 1
+                return conn
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in smtplib session. It goes back to the pool unless the connection failed."""
+        self._slots.acquire()
+        try:
+            conn = self._acquire()
+            try:
+                yield conn.smtp
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                if getattr(e, "smtp_code", None) == 421:  # server is closing the session
+                    self._discard(conn)
+                else:
+                    self._release(conn)  # only this message was refused; smtplib has sent RSET
+                raise
+            except BaseException:
+                self._discard(conn)
+                raise
+            self._release(conn)
+        finally:
+            self._slots.release()
+
+    def _release(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if not self._closed:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def send(self, msg: EmailMessage) -> None:
+        with self.connection() as smtp:
+            smtp.send_message(msg)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._quit(conn.smtp)
+
+class MailDelivery:
+    """
+    Asyncio send queue running on its own thread. submit() is safe from any thread (including
+    Tk callbacks) and returns a concurrent.futures.Future. Transient failures are retried with
+    exponential backoff and jitter, up to config.max_attempts tries per message.
+    """
+    def __init__(self, config: SMTPConfig = None, pool: SMTPConnectionPool = None,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        self.config = config or (pool.config if pool else SMTPConfig.from_env())
+        self.pool = pool or SMTPConnectionPool(self.config)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._workers = max(self.config.pool_size, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="smtp")
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mail-delivery", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        tasks = [self._loop.create_task(self._worker()) for _ in range(self._workers)]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    def build_message(self, to_email: str, subject: str, body: str) -> EmailMessage:
+        if not (self.config.host and self.config.from_address):
+            raise RuntimeError("SMTP configuration missing (set STEG_SMTP_HOST / STEG_SMTP_USERNAME).")
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.config.from_address
+        msg["To"] = to_email
+        msg.set_content(body)
+        return msg
+
+    def submit(self, to_email: str, subject: str, body: str) -> Future:
+        future = Future()
+        try:
+            msg = self.build_message(to_email, subject, body)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        if self._loop.is_closed() or not self._loop.is_running():
+            future.set_exception(RuntimeError("Mail delivery is closed."))
+            return future
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (msg, future))
+        return future
+
+    def send(self, to_email: str, subject: str, body: str, timeout: float = None) -> None:
+        """Blocking convenience wrapper around submit()."""
+        self.submit(to_email, subject, body).result(timeout)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _worker(self) -> None:
+        while True:
+            msg, future = await self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    await self._deliver(msg, future)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, msg: EmailMessage, future: Future) -> None:
+        for attempt in range(1, self.config.max_attempts + 1):
+            try:
+                await self._loop.run_in_executor(self._executor, self.pool.send, msg)
+            except Exception as e:
+                if attempt == self.config.max_attempts or not is_transient(e):
+                    future.set_exception(e)
+                    return
+                await asyncio.sleep(self._backoff(attempt))
+            else:
+                future.set_result(attempt)
+                return
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Finish queued messages (up to timeout seconds), then stop the loop and the pool."""
+        if not self._thread.is_alive():
+            return
+        drained = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            drained.result(timeout)
+        except Exception:
+            drained.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+_default_delivery = None
+_default_lock = threading.Lock()
+
+def get_delivery() -> MailDelivery:
+    """Process-wide MailDelivery configured from the environment, created on first use."""
+    global _default_delivery
+    with _default_lock:
+        if _default_delivery is None:
+            _default_delivery = MailDelivery(SMTPConfig.from_env())
+            atexit.register(_default_delivery.close)
+        return _default_delivery
+
+class LocalSMTPServer:
+    """
+    In-memory SMTP stand-in on 127.0.0.1 built on aiosmtpd (optional dependency). delay adds
+    per-message latency; the first transient_failures messages get a 451 reply to exercise retry.
+
+        with LocalSMTPServer() as server:
+            MailDelivery(server.config).send("a@b.c", "subject", "body")
+            server.messages  # received envelopes
+    """
+    def __init__(self, port: int = 0, delay: float = 0.0, transient_failures: int = 0):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            raise RuntimeError("The local SMTP stand-in needs aiosmtpd (pip install aiosmtpd).") from None
+        if not port:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+        self.port = port
+        self.delay = delay
+        self.transient_failures = transient_failures
+        self.messages = []
+        self._controller = Controller(self, hostname="127.0.0.1", port=port)
+
+    @property
+    def config(self) -> SMTPConfig:
+        return SMTPConfig(host="127.0.0.1", port=self.port, security="none",
+                          sender="steg@localhost", timeout=10.0)
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.transient_failures > 0:
+            self.transient_failures -= 1
+            return "451 Try again later"
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def start(self) -> None:
+        self._controller.start()
+
+    def stop(self) -> None:
+        self._controller.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def load_test(delivery: MailDelivery, count: int, to_email: str) -> dict:
+    """Submit count messages at once; returns latency percentiles (seconds) and throughput."""
+    latencies = []
+    failures = []
+    start = time.perf_counter()
+
+    def done(f, submitted):
+        if f.exception():
+            failures.append(f.exception())
+            if len(failures) == 1:
+                print(f"First failure: {f.exception()}", file=sys.stderr)
+        else:
+            latencies.append(time.perf_counter() - submitted)
+
+    futures = []
+    for n in range(count):
+        submitted = time.perf_counter()
+        future = delivery.submit(to_email, f"Load test {n}", f"Your verification code is: {n:06d}")
+        future.add_done_callback(lambda f, s=submitted: done(f, s))
+        futures.append(future)
+    for future in futures:
+        try:
+            future.result()
+        except Exception:
+            pass
+    seconds = time.perf_counter() - start
+    return {
+        "sent": len(latencies), "failed": len(failures), "seconds": seconds,
+        "messages_per_second": len(latencies) / seconds if seconds else 0.0,
+        "p50": _percentile(latencies, 0.50), "p95": _percentile(latencies, 0.95),
+        "max": max(latencies, default=0.0), "pool": dict(delivery.pool.stats),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m steg_tab.mail_delivery",
+                                     description="Measure OTP mail delivery latency and throughput.")
+    parser.add_argument("--local", action="store_true", help="send to an in-process aiosmtpd stand-in")
+    parser.add_argument("--count", type=int, default=100, help="messages to send")
+    parser.add_argument("--to", default="receiver@localhost", help="recipient address")
+    parser.add_argument("--pool-size", type=int, default=None, help="SMTP connections (default: config)")
+    parser.add_argument("--server-delay", type=float, default=0.0, help="stand-in latency per message (s)")
+    parser.add_argument("--transient-failures", type=int, default=0, help="stand-in 451 replies before accepting")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.local:
+        server = LocalSMTPServer(delay=args.server_delay, transient_failures=args.transient_failures)
+        server.start()
+        config = server.config
+    else:
+        config = SMTPConfig.from_env()
+    if args.pool_size:
+        config = replace(config, pool_size=args.pool_size)
+    delivery = MailDelivery(config, base_delay=0.05 if args.local else 1.0)
+    try:
+        result = load_test(delivery, args.count, args.to)
+    finally:
+        delivery.close()
+        if server:
+            server.stop()
+    print(f"{result['sent']} sent, {result['failed']} failed in {result['seconds']:.2f}s "
+          f"({result['messages_per_second']:.1f} msg/s); latency p50 {result['p50'] * 1000:.0f} ms, "
+          f"p95 {result['p95'] * 1000:.0f} ms, max {result['max'] * 1000:.0f} ms; pool {result['pool']}")
+    return 1 if result["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# steg_tab/payload_cache.py
+# LRU cache of extracted payloads, so re-opening an image (or a copy of it) skips the LSB walk.
+#
+# Lookups go by (path, size, mtime) first; on a miss the file's SHA-256 content hash is used,
+# which also catches renamed or copied images. Only the raw payload container is cached, and it
+# is parsed on every hit.
+#
+# The optional disk tier (STEG_PAYLOAD_CACHE_DIR, or disk_dir=) lets results survive restarts.
+# Each entry is encrypted with a key derived from the image's content hash (SHAKE-256
+# keystream, keyed BLAKE2b tag), and its file name comes from a separate derivation. A cache
+# file is therefore unreadable without the image it came from, and that image carries the
+# payload anyway.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .steg_crypto import extract_payload_bytes, parse_payload, read_payload_header
+
+HASH_BLOCK = 1 << 20
+DISK_MAGIC = b"SPC1"
+TAG_BYTES = 16
+
+def hash_file(path: str) -> bytes:
+    h = hashlib.sha256()  # hardware-accelerated on most CPUs
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.digest()
+
+def _derive(digest: bytes, purpose: bytes) -> bytes:
+    return hashlib.blake2b(digest, digest_size=32, person=b"steg-cache-" + purpose).digest()
+
+def _keystream(key: bytes, length: int) -> bytes:
+    return hashlib.shake_256(key).digest(length)
+
+def _xor(data: bytes, stream: bytes) -> bytes:
+    return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(data), "big")
+
+class PayloadCache:
+    """
+    Thread-safe LRU of payload bytes, bounded by entry count and total bytes, with an optional
+    encrypted disk tier bounded by disk_max_bytes (least recently used files are deleted first).
+    """
+    def __init__(self, max_entries: int = 128, max_bytes: int = 32 << 20, disk_dir: str = None,
+                 disk_max_bytes: int = 256 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.stats = {"hits": 0, "hash_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._entries = OrderedDict()  # content digest -> payload bytes
+        self._by_stat = OrderedDict()  # (path, size, mtime_ns) -> content digest
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, environ=None) -> "PayloadCache":
+        environ = os.environ if environ is None else environ
+        return cls(disk_dir=environ.get("STEG_PAYLOAD_CACHE_DIR") or None)
+
+    @staticmethod
+    def _stat_key(path: str):
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def payload_bytes(self, path: str, progress=None) -> bytes:
+        """
+        Cached extract_payload_bytes(path). Errors are not cached. A file not seen before is
+        screened from its header pixels before it is hashed, so non-stego images fail fast.
+        """
+        stat_key = self._stat_key(path)
+        with self._lock:
+            digest = self._by_stat.get(stat_key)
+            if digest is not None:
+                self._by_stat.move_to_end(stat_key)
+                payload = self._lookup(digest)
+                if payload is not None:
+                    self.stats["hits"] += 1
+                    return payload
+
+        if digest is None:
+            read_payload_header(path)  # raises ValueError for images without a payload
+            digest = hash_file(path)
+            with self._lock:
+                self._remember_stat(stat_key, digest)
+                payload = self._lookup(digest)
+                if payload is not None:
+                    self.stats["hash_hits"] += 1
+                    return payload
+
+        payload = self._disk_get(digest)
+        if payload is not None:
+            with self._lock:
+                self.stats["disk_hits"] += 1
+                self._store(digest, payload)
+            return payload
+
+        payload = extract_payload_bytes(path, progress)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._store(digest, payload)
+        self._disk_put(digest, payload)
+        return payload
+
+    def decode(self, path: str, progress=None) -> dict:
+        """Cached decode_secret_payload(path): {"email":..., "message":...}."""
+        return parse_payload(self.payload_bytes(path, progress))
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_stat.clear()
+            self._bytes = 0
+        if disk and self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".bin"):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # memory tier (call with the lock held)
+
+    def _lookup(self, digest: bytes):
+        payload = self._entries.get(digest)
+        if payload is not None:
+            self._entries.move_to_end(digest)
+        return payload
+
+    def _remember_stat(self, stat_key, digest: bytes) -> None:
+        self._by_stat[stat_key] = digest
+        self._by_stat.move_to_end(stat_key)
+        while len(self._by_stat) > 4 * self.max_entries:
+            self._by_stat.popitem(last=False)
+
+    def _store(self, digest: bytes, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        if digest in self._entries:
+            self._bytes -= len(self._entries.pop(digest))
+        self._entries[digest] = payload
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    # disk tier
+
+    def _disk_path(self, digest: bytes) -> str:
+        return os.path.join(self.disk_dir, _derive(digest, b"name").hex()[:40] + ".bin")
+
+    def _disk_get(self, digest: bytes):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        body = data[len(DISK_MAGIC) + TAG_BYTES:]
+        tag = hashlib.blake2b(body, digest_size=TAG_BYTES, key=_derive(digest, b"mac")).digest()
+        if not data.startswith(DISK_MAGIC) or data[len(DISK_MAGIC):len(DISK_MAGIC) + TAG_BYTES] != tag:
+            return None  # corrupt, or written by another format
+        try:
+            os.utime(path)  # recency for eviction
+        except OSError:
+            pass
+        return _xor(body, _keystream(_derive(digest, b"enc"), len(body)))
+
+    def _disk_put(self, digest: bytes, payload: bytes) -> None:
+        if not self.disk_dir or len(payload) > self.disk_max_bytes:
+            return
+        body = _xor(payload, _keystream(_derive(digest, b"enc"), len(payload)))
+        tag = hashlib.blake2b(body, digest_size=TAG_BYTES, key=_derive(digest, b"mac")).digest()
+        path = self._disk_path(digest)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(DISK_MAGIC + tag + body)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".bin"):
+                st = entry.stat()
+                files.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                return
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
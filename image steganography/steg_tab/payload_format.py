@@ -0,0 +1,179 @@
+# steg_tab/payload_format.py
+# Payload container stored behind the 32-bit length header.
+#
+# v1 container:  [magic/version byte][flags byte][body]
+#   body = varint len + email (utf-8), varint len + message (utf-8), optionally compressed
+#   flags bits 0-1: compression (0 none, 1 raw deflate, 2 raw LZMA2)
+#   flags bits 2-3: LSBs per channel minus one (body only; see steg_crypto)
+#   flags bit 4:    body also uses the alpha channel
+# Shard container (one per cover of a multi-image message, see shards.py):
+#   [shard byte][flags byte][message id, 8 bytes][crc32 of the joined v1 container, 4 bytes]
+#   [varint index][varint total][chunk]
+#   flags carry the embedding mode as in v1; the chunks joined in index order form a v1 container.
+# Legacy payloads are compact JSON {"email":..., "message":...} and always start with "{".
+
+import json
+import lzma
+import struct
+import zlib
+from dataclasses import dataclass
+
+CONTAINER_V1 = 0xF5  # never a valid UTF-8 lead byte, so it cannot collide with legacy JSON
+CONTAINER_SHARD = 0xF6  # likewise
+LEGACY_LEAD = ord("{")
+MESSAGE_ID_BYTES = 8
+
+COMPRESS_NONE = 0
+COMPRESS_ZLIB = 1
+COMPRESS_LZMA = 2
+COMPRESSION_MASK = 0x03
+BITS_SHIFT = 2
+BITS_MASK = 0x0C
+ALPHA_FLAG = 0x10
+
+# The dictionary, not the preset, sets LZMA's cost: preset 9's default 64 MiB takes ~50 ms and
+# ~65 MB to set up even for a few bytes. Messages are far smaller than 1 MiB, so capping it
+# keeps the same ratio. Decoding uses the same filter, so the two stay in step.
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 9 | lzma.PRESET_EXTREME, "dict_size": 1 << 20}]
+LZMA_MIN_BYTES = 256  # below this LZMA never beats deflate by enough to matter
+
+def _compress(method: int, data: bytes) -> bytes:
+    if method == COMPRESS_ZLIB:
+        c = zlib.compressobj(9, zlib.DEFLATED, -15)
+        return c.compress(data) + c.flush()
+    if method == COMPRESS_LZMA:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    return data
+
+def _decompress(method: int, data: bytes) -> bytes:
+    if method == COMPRESS_ZLIB:
+        return zlib.decompress(data, -15)
+    if method == COMPRESS_LZMA:
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    if method == COMPRESS_NONE:
+        return data
+    raise ValueError(f"Unknown compression method {method}.")
+
+def _write_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _read_varint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated field length.")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def _read_field(data: bytes, pos: int):
+    length, pos = _read_varint(data, pos)
+    if pos + length > len(data):
+        raise ValueError("Truncated field.")
+    return data[pos:pos + length].decode("utf-8"), pos + length
+
+def is_payload_lead(byte: int) -> bool:
+    """True if byte can start a payload (v1 container, shard or legacy JSON)."""
+    return byte in (CONTAINER_V1, CONTAINER_SHARD, LEGACY_LEAD)
+
+def plausible_preamble(length: int, lead: int, flags: int) -> bool:
+    """
+    Cheap check on a payload's length and first two bytes, which the embedder always writes
+    in the first pixels. Ordinary images pass with odds of a few in a million.
+    """
+    if lead == CONTAINER_V1:
+        return length >= 4 and not flags & ~(COMPRESSION_MASK | BITS_MASK | ALPHA_FLAG) \
+            and flags & COMPRESSION_MASK <= COMPRESS_LZMA
+    if lead == CONTAINER_SHARD:
+        return length >= 2 + MESSAGE_ID_BYTES + 4 + 2 and not flags & ~(BITS_MASK | ALPHA_FLAG)
+    return lead == LEGACY_LEAD and flags == ord('"') and length >= 2  # compact JSON: {"email":...
+
+def _mode_flags(bits_per_channel: int, use_alpha: bool) -> int:
+    if not 1 <= bits_per_channel <= 4:
+        raise ValueError("bits_per_channel must be between 1 and 4.")
+    return (bits_per_channel - 1) << BITS_SHIFT | (ALPHA_FLAG if use_alpha else 0)
+
+def embedding_mode(lead: int, flags: int):
+    """(bits_per_channel, use_alpha) recorded in a payload's first two bytes."""
+    if lead not in (CONTAINER_V1, CONTAINER_SHARD):
+        return 1, False  # legacy JSON is always 1 LSB in R,G,B
+    return ((flags & BITS_MASK) >> BITS_SHIFT) + 1, bool(flags & ALPHA_FLAG)
+
+def pack_payload(recipient_email: str, secret_message: str, compress: bool = True,
+                 bits_per_channel: int = 1, use_alpha: bool = False) -> bytes:
+    """
+    Build a v1 container. With compress=True, deflate and (for bodies of LZMA_MIN_BYTES or
+    more) LZMA are tried and the smallest result wins; the body is stored uncompressed if
+    neither shrinks it.
+    bits_per_channel/use_alpha record the embedding mode for the decoder.
+    """
+    mode_flags = _mode_flags(bits_per_channel, use_alpha)
+    raw = b"".join(_write_varint(len(f)) + f for f in (recipient_email.encode("utf-8"),
+                                                       secret_message.encode("utf-8")))
+    method, body = COMPRESS_NONE, raw
+    if compress:
+        for candidate in (COMPRESS_ZLIB, COMPRESS_LZMA) if len(raw) >= LZMA_MIN_BYTES else (COMPRESS_ZLIB,):
+            packed = _compress(candidate, raw)
+            if len(packed) < len(body):
+                method, body = candidate, packed
+    return bytes([CONTAINER_V1, method | mode_flags]) + body
+
+def unpack_payload(data: bytes) -> dict:
+    """Parse a v1 container or a legacy JSON payload into {"email":..., "message":...}."""
+    if not data:
+        raise ValueError("Empty payload.")
+    if data[0] == CONTAINER_SHARD:
+        shard = unpack_shard(data)
+        raise ValueError(f"This image holds part {shard.index + 1} of a {shard.total}-image message; "
+                         f"open all {shard.total} images together.")
+    if data[0] != CONTAINER_V1:
+        return json.loads(data.decode("utf-8"))
+    if len(data) < 2:
+        raise ValueError("Truncated payload container.")
+    body = _decompress(data[1] & COMPRESSION_MASK, data[2:])
+    email, pos = _read_field(body, 0)
+    message, pos = _read_field(body, pos)
+    return {"email": email, "message": message}
+
+@dataclass
+class Shard:
+    message_id: bytes
+    index: int  # 0-based
+    total: int
+    crc: int  # crc32 of the joined v1 container
+    chunk: bytes
+
+def shard_overhead(total: int) -> int:
+    """Largest shard header, in bytes, for a message split into total shards."""
+    return 2 + MESSAGE_ID_BYTES + 4 + 2 * len(_write_varint(total))
+
+def pack_shard(shard: Shard, bits_per_channel: int = 1, use_alpha: bool = False) -> bytes:
+    if len(shard.message_id) != MESSAGE_ID_BYTES:
+        raise ValueError(f"message_id must be {MESSAGE_ID_BYTES} bytes.")
+    if not 0 <= shard.index < shard.total:
+        raise ValueError("Shard index out of range.")
+    return (bytes([CONTAINER_SHARD, _mode_flags(bits_per_channel, use_alpha)]) + shard.message_id
+            + struct.pack(">I", shard.crc) + _write_varint(shard.index) + _write_varint(shard.total) + shard.chunk)
+
+def unpack_shard(data: bytes) -> Shard:
+    if len(data) < 2 + MESSAGE_ID_BYTES + 4 or data[0] != CONTAINER_SHARD:
+        raise ValueError("Not a shard container.")
+    pos = 2 + MESSAGE_ID_BYTES
+    message_id = data[2:pos]
+    (crc,) = struct.unpack(">I", data[pos:pos + 4])
+    index, pos = _read_varint(data, pos + 4)
+    total, pos = _read_varint(data, pos)
+    if not 0 <= index < total:
+        raise ValueError("Shard index out of range.")
+    return Shard(message_id, index, total, crc, data[pos:])
@@ -0,0 +1,142 @@
+# steg_tab/png_strips.py
+# Strip-at-a-time PNG reading/writing so large covers never sit fully decoded in memory.
+
+from PIL import Image
+import numpy as np
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+READ_BLOCK = 64 * 1024
+IDAT_SIZE = 64 * 1024
+
+# 8-bit modes whose PNG raw row layout is the PIL mode itself
+_STREAMABLE_MODES = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4, "P": 1}
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+def is_streamable(img) -> bool:
+    """True if img is a non-interlaced 8-bit PNG that iter_strips can decode piecewise."""
+    if img.format != "PNG" or img.info.get("interlace"):
+        return False
+    tile = getattr(img, "tile", None)
+    if not tile or len(tile) != 1:
+        return False
+    rawmode = tuple(tile[0])[3]
+    return img.mode in _STREAMABLE_MODES and rawmode == img.mode
+
+def _iter_filtered_rows(path: str, stride: int, strip_rows: int):
+    """Yield blocks of up to strip_rows still-filtered scanlines (filter byte + stride bytes each)."""
+    inflater = zlib.decompressobj()
+    block_size = strip_rows * (stride + 1)
+    pending = bytearray()
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            raise ValueError("Not a PNG file.")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type == b"IEND":
+                break
+            if chunk_type != b"IDAT":
+                f.seek(length + 4, 1)
+                continue
+            remaining = length
+            while remaining:
+                data = f.read(min(READ_BLOCK, remaining))
+                remaining -= len(data)
+                while data:
+                    pending += inflater.decompress(data, block_size)
+                    data = inflater.unconsumed_tail
+                    while len(pending) >= block_size:
+                        yield bytes(pending[:block_size])
+                        del pending[:block_size]
+            f.seek(4, 1)  # CRC
+    pending += inflater.flush()
+    while pending:
+        yield bytes(pending[:block_size])
+        del pending[:block_size]
+
+def iter_strips(img, path: str, strip_rows: int):
+    """
+    Yield horizontal strips of a streamable PNG as PIL images in the source mode.
+    Each strip is unfiltered by PIL's own decoder, seeded with the previous strip's last row,
+    so only one strip of decoded pixels is held at a time.
+    """
+    width = img.width
+    mode = img.mode
+    stride = width * _STREAMABLE_MODES[mode]
+    palette = img.getpalette() if mode == "P" else None
+    transparency = img.info.get("transparency")
+    prev_row = None
+    for block in _iter_filtered_rows(path, stride, strip_rows):
+        rows = len(block) // (stride + 1)
+        seeded = prev_row is not None
+        if seeded:
+            block = b"\x00" + prev_row + block  # unfiltered seed row for Up/Avg/Paeth
+        decoded = Image.frombytes(mode, (width, rows + seeded), zlib.compress(block, 0), "zip", mode)
+        if seeded:
+            decoded = decoded.crop((0, 1, width, rows + 1))
+        prev_row = decoded.crop((0, rows - 1, width, rows)).tobytes()
+        if palette is not None:
+            decoded.putpalette(palette)
+        if transparency is not None:
+            decoded.info["transparency"] = transparency
+        yield decoded
+
+class RGBAStripWriter:
+    """
+    Writes an 8-bit RGBA PNG one strip of rows at a time.
+    Rows use the Up filter, computed against the previous strip's last row.
+    """
+    def __init__(self, path: str, width: int, height: int, compress_level: int = 6):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._f = open(path, "wb")
+        self._deflater = zlib.compressobj(compress_level)
+        self._buffer = bytearray()
+        self._prev_row = np.zeros(width * 4, dtype=np.uint8)
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        self._f.write(PNG_SIGNATURE + _chunk(b"IHDR", ihdr))
+
+    def write(self, rows: np.ndarray) -> None:
+        """rows: uint8 array of shape (n, width, 4) or (n * width, 4)."""
+        rows = rows.reshape(-1, self.width * 4)
+        filtered = np.empty((len(rows), self.width * 4 + 1), dtype=np.uint8)
+        filtered[:, 0] = 2  # Up
+        filtered[0, 1:] = rows[0] - self._prev_row
+        filtered[1:, 1:] = rows[1:] - rows[:-1]
+        self._prev_row = rows[-1].copy()
+        self.rows_written += len(rows)
+        self._emit(self._deflater.compress(filtered.tobytes()))
+
+    def _emit(self, data: bytes, final: bool = False) -> None:
+        self._buffer += data
+        while len(self._buffer) >= IDAT_SIZE or (final and self._buffer):
+            self._f.write(_chunk(b"IDAT", bytes(self._buffer[:IDAT_SIZE])))
+            del self._buffer[:IDAT_SIZE]
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Wrote {self.rows_written} of {self.height} rows.")
+            self._emit(self._deflater.flush(), final=True)
+            self._f.write(_chunk(b"IEND", b""))
+        finally:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._f.close()
+        else:
+            self.close()
@@ -1,44 +1,32 @@
 # steg_tab/receiver_tab.py
 import os
-import threading
 import random
 import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-from email.message import EmailMessage
-import smtplib
 
-from .steg_crypto import decode_secret_payload
 
 # OTP settings
 OTP_LENGTH = 6
 OTP_EXPIRY_SECONDS = 300  # 5 minutes
 MAX_OTP_ATTEMPTS = 3
+SEND_POLL_MS = 100  # how often the Tk thread checks a pending OTP send
 
-# SMTP config (hardcoded per your request)
-SMTP_HOST = "smtp.gmail.com"
-SMTP_PORT = 465
-SMTP_USERNAME = "gdfg33379@gmail.com"
-SMTP_PASSWORD = "indeybktmqywpmfa"  # app password (spaces removed)
+# SMTP host/credentials come from STEG_SMTP_* environment variables (see mail_delivery.py)
 
 def generate_otp(length=OTP_LENGTH):
     return f"{random.randint(0, 10**length - 1):0{length}d}"
 
 def send_email_smtp(to_email: str, subject: str, body: str):
-    if not (SMTP_HOST and SMTP_USERNAME and SMTP_PASSWORD):
-        raise RuntimeError("SMTP configuration missing.")
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = SMTP_USERNAME
-    msg["To"] = to_email
-    msg.set_content(body)
-    with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.send_message(msg)
+    """Send through the shared pooled delivery queue and wait for the result."""
+    from .mail_delivery import get_delivery
+    get_delivery().send(to_email, subject, body)
 
 class ReceiverTab(ttk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, jobs):
         super().__init__(parent)
+        self.jobs = jobs  # shared JobManager; payload reads run in its thread pool
+        self._cache = None  # PayloadCache, created on first read; re-opened images skip the LSB walk
         self.image_path = tk.StringVar()
 
         # payload will hold dict {'email':..., 'message':...} after reading file
@@ -73,25 +61,48 @@ class ReceiverTab(ttk.Frame):
         ttk.Button(self, text="Copy Message", command=self.copy_message).pack(pady=6)
 
     def browse_image(self):
-        file_path = filedialog.askopenfilename(
-            title="Select Stego Image",
-            filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")]
+        # several files: the parts of a multi-image message, in any order
+        file_paths = filedialog.askopenfilenames(
+            title="Select Stego Image(s)",
+            filetypes=[("Image Files", "*.png;*.webp;*.tif;*.tiff;*.bmp;*.jpg;*.jpeg")]
         )
-        if file_path:
+        if file_paths:
+            file_path = "; ".join(file_paths)
             self.image_path.set(file_path)
             # immediate read payload (email+message) but DO NOT display message
-            try:
-                payload = decode_secret_payload(file_path)
-                if not isinstance(payload, dict) or "email" not in payload or "message" not in payload:
-                    raise ValueError("Payload missing expected fields")
-                self._payload = payload
-                self.recipient_email_var.set(payload.get("email", "(no email)"))
-                self.status_var.set("Payload read: recipient email detected")
-            except Exception as e:
-                self._payload = None
-                self.recipient_email_var.set("(no recipient email detected)")
-                self.status_var.set("No valid payload detected")
-                messagebox.showwarning("Payload read warning", f"Could not read payload from image:\n{e}")
+            self._payload = None
+            self.recipient_email_var.set("(reading payload...)")
+            self.status_var.set("Reading payload...")
+            if self._cache is None:
+                from .payload_cache import PayloadCache
+                self._cache = PayloadCache.from_env()
+            on_done = lambda job, payload: self._payload_read(file_path, job, payload)
+            if len(file_paths) == 1:
+                self.jobs.submit("Reading payload", self._cache.decode, file_paths[0], on_done=on_done)
+            else:
+                from .shards import decode_shards
+                self.jobs.submit(f"Reading {len(file_paths)} images", decode_shards, list(file_paths),
+                                 read=self._cache.payload_bytes, on_done=on_done)
+
+    def _payload_read(self, file_path, job, payload):
+        if file_path != self.image_path.get():
+            return  # another image was chosen meanwhile
+        try:
+            if job.error:
+                raise job.error
+            if not isinstance(payload, dict) or "email" not in payload or "message" not in payload:
+                raise ValueError("Payload missing expected fields")
+            self._payload = payload
+            self.recipient_email_var.set(payload.get("email", "(no email)"))
+            self.status_var.set("Payload read: recipient email detected")
+        except Exception as e:
+            self._payload = None
+            self.recipient_email_var.set("(no recipient email detected)")
+            if job.cancelled:
+                self.status_var.set("Payload read cancelled")
+                return
+            self.status_var.set("No valid payload detected")
+            messagebox.showwarning("Payload read warning", f"Could not read payload from image:\n{e}")
 
     # OTP flow
     def request_otp_flow(self):
@@ -112,8 +123,23 @@ class ReceiverTab(ttk.Frame):
         self._set_sending_state(True)
         self.status_var.set("Sending OTP...")
 
-        t = threading.Thread(target=self._send_otp_background, args=(to_email, self._current_otp), daemon=True)
-        t.start()
+        subject = "Your verification code"
+        body = f"Your verification code is: {self._current_otp}\nThis code will expire in {OTP_EXPIRY_SECONDS//60} minutes."
+        try:
+            from .mail_delivery import get_delivery
+            future = get_delivery().submit(to_email, subject, body)
+        except Exception as e:
+            self._on_otp_sent(to_email, str(e))
+            return
+        self._poll_otp_send(future, to_email)
+
+    def _poll_otp_send(self, future, to_email):
+        # polled from the Tk thread; Tk must never be called from the delivery thread
+        if not future.done():
+            self.after(SEND_POLL_MS, self._poll_otp_send, future, to_email)
+            return
+        error = future.exception()
+        self._on_otp_sent(to_email, str(error) if error else None)
 
     def _set_sending_state(self, sending: bool):
         self._is_sending = sending
@@ -122,25 +148,15 @@ class ReceiverTab(ttk.Frame):
         else:
             self.otp_button.state(["!disabled"])
 
-    def _send_otp_background(self, to_email, otp):
-        subject = "Your verification code"
-        body = f"Your verification code is: {otp}\nThis code will expire in {OTP_EXPIRY_SECONDS//60} minutes."
-        error = None
-        try:
-            send_email_smtp(to_email, subject, body)
-        except Exception as e:
-            error = str(e)
-
-        def on_done():
-            self._set_sending_state(False)
-            if error:
-                self.status_var.set("Failed to send OTP")
-                messagebox.showerror("OTP Send Error", f"Failed to send OTP email:\n{error}")
-            else:
-                self.status_var.set("OTP sent — waiting for input")
-                messagebox.showinfo("OTP Sent", f"An OTP has been sent to {to_email}. It will expire in {OTP_EXPIRY_SECONDS//60} minutes.")
-                self._prompt_for_otp_and_verify()
-        self.after(50, on_done)
+    def _on_otp_sent(self, to_email, error):
+        self._set_sending_state(False)
+        if error:
+            self.status_var.set("Failed to send OTP")
+            messagebox.showerror("OTP Send Error", f"Failed to send OTP email:\n{error}")
+        else:
+            self.status_var.set("OTP sent — waiting for input")
+            messagebox.showinfo("OTP Sent", f"An OTP has been sent to {to_email}. It will expire in {OTP_EXPIRY_SECONDS//60} minutes.")
+            self._prompt_for_otp_and_verify()
 
     def _prompt_for_otp_and_verify(self):
         attempts = 0
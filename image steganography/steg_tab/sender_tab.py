@@ -2,13 +2,16 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from .steg_crypto import embed_secret_message
+
+from .output_formats import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
 
 class SenderTab(ttk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, jobs):
         super().__init__(parent)
+        self.jobs = jobs  # shared JobManager; embedding runs in its process pool
 
         self.image_path = tk.StringVar()
+        self._covers = []  # several covers selected: the message is split across them
         self.secret_msg = tk.StringVar()
         self.recipient_email = tk.StringVar()
 
@@ -30,33 +33,119 @@ class SenderTab(ttk.Frame):
         ttk.Label(frame_email, text="Recipient Email:").pack(side="left")
         ttk.Entry(frame_email, textvariable=self.recipient_email, width=40).pack(side="left", padx=5)
 
-        ttk.Button(self, text="Embed & Save", command=self.embed_and_save).pack(pady=20)
+        # output format: faster codecs trade file size for encode time
+        self.output_format = tk.StringVar(value=DEFAULT_OUTPUT_FORMAT)
+        frame_format = ttk.Frame(self)
+        frame_format.pack(pady=10, fill="x", padx=20)
+        ttk.Label(frame_format, text="Output Format:").pack(side="left")
+        ttk.Combobox(frame_format, textvariable=self.output_format, values=list(OUTPUT_FORMATS),
+                     state="readonly", width=10).pack(side="left", padx=5)
+        self.format_label = ttk.Label(frame_format, text=OUTPUT_FORMATS[DEFAULT_OUTPUT_FORMAT].description)
+        self.format_label.pack(side="left")
+        self.output_format.trace_add("write", lambda *_: self.format_label.config(
+            text=OUTPUT_FORMATS[self.output_format.get()].description))
+
+        self.embed_button = ttk.Button(self, text="Embed & Save", command=self.embed_and_save)
+        self.embed_button.pack(pady=20)
 
     def browse_image(self):
-        file_path = filedialog.askopenfilename(
-            title="Select Image",
-            filetypes=[("Image Files", "*.png *.jpg *.jpeg *.bmp")]
+        file_paths = filedialog.askopenfilenames(
+            title="Select Image(s)",
+            filetypes=[("Image Files", "*.png *.jpg *.jpeg *.bmp *.webp *.tif *.tiff")]
         )
-        if file_path:
-            self.image_path.set(file_path)
+        if file_paths:
+            self._covers = list(file_paths)
+            self.image_path.set("; ".join(file_paths))
+
+    def _selected_covers(self):
+        if self._covers and self.image_path.get() == "; ".join(self._covers):
+            return self._covers
+        return [self.image_path.get()]  # typed in by hand
 
     def embed_and_save(self):
         if not self.image_path.get() or not self.secret_msg.get() or not self.recipient_email.get():
             messagebox.showerror("Error", "Please select an image, enter a message, and provide recipient email")
             return
+        covers = self._selected_covers()
+        if len(covers) > 1:
+            self._embed_across(covers)
+            return
+
+        # engine modules (NumPy, PIL) load on first use, keeping app startup light
+        from .payload_format import pack_payload
+        from .steg_crypto import embed_secret_message_streaming, plan_capacity
+
+        # check fit from the image header alone, before asking where to save
+        try:
+            plan = plan_capacity(self.image_path.get(), pack_payload(self.recipient_email.get().strip(), self.secret_msg.get()),
+                                 self.output_format.get())
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read cover image:\n{str(e)}")
+            return
+        if not plan["fits"]:
+            messagebox.showerror("Error", f"Image too small. Need {plan['payload_bits']} bits but capacity is "
+                                          f"at most {plan['capacity_bits']} bits.\n"
+                                          "Select several cover images to split the message across them.")
+            return
 
+        output_format = OUTPUT_FORMATS[self.output_format.get()]
         save_path = filedialog.asksaveasfilename(
-            defaultextension=".png",
-            filetypes=[("PNG Image", "*.png")],
+            defaultextension=output_format.extension,
+            filetypes=[(f"{output_format.format} Image", "*" + output_format.extension)],
             title="Save Stego-Image As"
         )
         if save_path:
+            mode = f"{output_format.name}, {plan['bits_per_channel']} LSB per channel" + (" incl. alpha" if plan["use_alpha"] else "")
+            self.embed_button.state(["disabled"])
+            self.jobs.submit("Embedding message", embed_secret_message_streaming,
+                             self.image_path.get(), save_path, self.secret_msg.get(), self.recipient_email.get().strip(),
+                             bits_per_channel=plan["bits_per_channel"], use_alpha=plan["use_alpha"],
+                             output_format=output_format.name, process=True,
+                             on_done=lambda job, _: self._embed_done(job, save_path, mode))
+
+    def _embed_done(self, job, save_path, mode):
+        self.embed_button.state(["!disabled"])
+        if job.cancelled:
+            pass  # nothing to clean up: the output is only moved into place once complete
+        elif job.error:
+            messagebox.showerror("Error", f"Failed to embed message:\n{str(job.error)}")
+        else:
+            messagebox.showinfo("Success", f"Stego-image saved at:\n{save_path}\n({mode}, {job.elapsed:.1f}s)")
             try:
-                embed_secret_message(self.image_path.get(), save_path, self.secret_msg.get(), self.recipient_email.get().strip())
-                messagebox.showinfo("Success", f"Stego-image saved at:\n{save_path}")
+                os.startfile(os.path.dirname(save_path))
+            except Exception:
+                pass
+
+    def _embed_across(self, covers):
+        from .shards import default_shard_paths, embed_shards
+
+        out_dir = filedialog.askdirectory(title="Folder for the Stego-Images")
+        if not out_dir:
+            return
+        output_format = self.output_format.get()
+        try:
+            outputs = default_shard_paths(covers, out_dir, output_format)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.embed_button.state(["disabled"])
+        # a thread job: embed_shards runs its own process pool, one cover per worker
+        self.jobs.submit(f"Embedding across {len(covers)} images", embed_shards, covers, outputs,
+                         self.secret_msg.get(), self.recipient_email.get().strip(), output_format=output_format,
+                         on_done=lambda job, result: self._shards_done(job, outputs, result))
+
+    def _shards_done(self, job, outputs, result):
+        self.embed_button.state(["!disabled"])
+        if job.cancelled:
+            for path in outputs:
                 try:
-                    os.startfile(os.path.dirname(save_path))
-                except Exception:
+                    os.remove(path)  # partial output
+                except OSError:
                     pass
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to embed message:\n{str(e)}")
+        elif job.error:
+            messagebox.showerror("Error", f"Failed to embed message:\n{str(job.error)}")
+        else:
+            messagebox.showinfo("Success", f"Message split across {result['shards']} images in:\n"
+                                           f"{os.path.dirname(outputs[0])}\n"
+                                           f"Send all of them; the receiver opens them together, in any order. "
+                                           f"({job.elapsed:.1f}s)")
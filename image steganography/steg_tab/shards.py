@@ -0,0 +1,228 @@
+# steg_tab/shards.py
+# Multi-image messages. The payload container is split into numbered shards that share a random
+# message id, one shard per cover, sized in proportion to each cover's capacity and embedded
+# across a process pool. Receivers pass the stego files in any order and get the message back.
+# The shard layout is described in payload_format.py.
+#
+#   python -m steg_tab.shards embed a.png b.png c.png --message-file big.txt --recipient a@b.c --out-dir out
+#   python -m steg_tab.shards decode out/*.png
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+from .output_formats import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, get_output_format
+from .payload_format import (CONTAINER_SHARD, MESSAGE_ID_BYTES, Shard, pack_payload, pack_shard,
+                             shard_overhead, unpack_shard)
+from .steg_crypto import (HEADER_BITS, capacity_bits, embed_payload_streaming, extract_payload_bytes,
+                          parse_payload)
+
+def cover_capacities(covers: list, bits_per_channel: int = 1, use_alpha: bool = False) -> list:
+    """Container bytes each cover can hold, from the image headers alone."""
+    capacities = []
+    for cover in covers:
+        with Image.open(cover) as img:
+            bits = capacity_bits(img.width * img.height, bits_per_channel, use_alpha)
+        capacities.append(max(0, (bits - HEADER_BITS) // 8))
+    return capacities
+
+def split_sizes(length: int, capacities: list) -> list:
+    """Chunk sizes adding up to length that fill every cover to about the same fraction."""
+    room = sum(capacities)
+    if length > room:
+        raise ValueError(f"Covers too small. Need {length} bytes but together they hold {room} bytes.")
+    if not length:
+        return [0] * len(capacities)
+    sizes = [capacity * length // room for capacity in capacities]
+    # flooring left fewer than len(capacities) bytes over; each cover still short of full takes one
+    by_room = sorted(range(len(capacities)), key=lambda i: capacities[i] - sizes[i], reverse=True)
+    for i in by_room[:length - sum(sizes)]:
+        sizes[i] += 1
+    return sizes
+
+def build_shards(payload_bytes: bytes, capacities: list, bits_per_channel: int = 1, use_alpha: bool = False,
+                 message_id: bytes = None) -> list:
+    """Split a v1 container into one packed shard per capacity (some may carry an empty chunk)."""
+    total = len(capacities)
+    overhead = shard_overhead(total)
+    sizes = split_sizes(len(payload_bytes), [max(0, capacity - overhead) for capacity in capacities])
+    message_id = message_id or os.urandom(MESSAGE_ID_BYTES)
+    crc = zlib.crc32(payload_bytes)
+    shards, pos = [], 0
+    for index, size in enumerate(sizes):
+        shard = Shard(message_id, index, total, crc, payload_bytes[pos:pos + size])
+        shards.append(pack_shard(shard, bits_per_channel, use_alpha))
+        pos += size
+    return shards
+
+def default_shard_paths(covers: list, out_dir: str = None, output_format=DEFAULT_OUTPUT_FORMAT) -> list:
+    extension = get_output_format(output_format).extension
+    paths = [os.path.join(out_dir or os.path.dirname(cover),
+                          f"{os.path.splitext(os.path.basename(cover))[0]}_stego{extension}") for cover in covers]
+    if len(set(paths)) != len(paths):
+        raise ValueError("Two covers have the same file name; give explicit output paths.")
+    return paths
+
+def embed_shards(covers: list, outputs: list, secret_message: str, recipient_email: str, compress: bool = True,
+                 bits_per_channel: int = 1, use_alpha: bool = False, output_format=DEFAULT_OUTPUT_FORMAT,
+                 workers: int = None, progress=None) -> dict:
+    """
+    Embed one message across covers (one shard each, written to the matching outputs path)
+    using a process pool; each worker streams its cover strip by strip.
+    progress(shards_done, shards) is called as shards finish; it may raise to abort.
+    Returns {"message_id": hex, "shards": n, "chunk_bytes": [...]}.
+    Raises ValueError if the covers together are too small.
+    """
+    if not covers or len(covers) != len(outputs):
+        raise ValueError("Need one output path per cover.")
+    output_format = get_output_format(output_format).name
+    payload_bytes = pack_payload(recipient_email, secret_message, compress)
+    shards = build_shards(payload_bytes, cover_capacities(covers, bits_per_channel, use_alpha),
+                          bits_per_channel, use_alpha)
+    options = {"bits_per_channel": bits_per_channel, "use_alpha": use_alpha, "output_format": output_format}
+    workers = min(workers or os.cpu_count() or 1, len(covers))
+    if workers == 1:
+        for done, (cover, output, shard) in enumerate(zip(covers, outputs, shards), start=1):
+            embed_payload_streaming(cover, output, shard, **options)
+            if progress:
+                progress(done, len(shards))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(embed_payload_streaming, cover, output, shard, **options)
+                       for cover, output, shard in zip(covers, outputs, shards)]
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    if progress:
+                        progress(done, len(futures))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+    unpacked = [unpack_shard(shard) for shard in shards]
+    return {"message_id": unpacked[0].message_id.hex(), "shards": len(shards),
+            "chunk_bytes": [len(shard.chunk) for shard in unpacked]}
+
+def read_payloads(paths: list, read=None, workers: int = None, progress=None) -> list:
+    """
+    Raw payload bytes of each file, in paths order, read on a thread pool (PIL decodes outside
+    the GIL). read defaults to extract_payload_bytes; PayloadCache.payload_bytes also fits.
+    """
+    read = read or extract_payload_bytes
+    payloads = [None] * len(paths)
+    with ThreadPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(paths) or 1)) as pool:
+        futures = {pool.submit(read, path): i for i, path in enumerate(paths)}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    payloads[i] = future.result()
+                except ValueError as e:
+                    raise ValueError(f"{os.path.basename(paths[i])}: {e}") from e
+                if progress:
+                    progress(done, len(paths))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    return payloads
+
+def join_shards(payloads: list, names: list = None) -> bytes:
+    """Reassemble the v1 container from shard payloads given in any order."""
+    names = names or [f"file {i + 1}" for i in range(len(payloads))]
+    shards = {}
+    for name, payload in zip(names, payloads):
+        if not payload or payload[0] != CONTAINER_SHARD:
+            raise ValueError(f"{os.path.basename(name)} holds a complete message, not part of one.")
+        shard = unpack_shard(payload)
+        first = next(iter(shards.values()), shard)
+        if (shard.message_id, shard.total, shard.crc) != (first.message_id, first.total, first.crc):
+            raise ValueError(f"{os.path.basename(name)} belongs to a different message.")
+        if shards.setdefault(shard.index, shard).chunk != shard.chunk:
+            raise ValueError(f"Conflicting copies of part {shard.index + 1}.")
+    if not shards:
+        raise ValueError("No images given.")
+    total = first.total
+    missing = [str(i + 1) for i in range(total) if i not in shards]
+    if missing:
+        raise ValueError(f"Missing part(s) {', '.join(missing)} of {total}.")
+    payload_bytes = b"".join(shards[i].chunk for i in range(total))
+    if zlib.crc32(payload_bytes) != first.crc:
+        raise ValueError("Reassembled message failed its checksum.")
+    return payload_bytes
+
+def decode_shards(paths: list, read=None, workers: int = None, progress=None) -> dict:
+    """
+    decode_secret_payload for a multi-image message: {"email":..., "message":...} from all of
+    its stego files, in any order. A single ordinary stego image is decoded as usual.
+    """
+    payloads = read_payloads(paths, read, workers, progress)
+    if len(payloads) == 1 and payloads[0][:1] != bytes([CONTAINER_SHARD]):
+        return parse_payload(payloads[0])
+    return parse_payload(join_shards(payloads, paths))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m steg_tab.shards",
+                                     description="Split a message across several cover images, or join it back.")
+    parser.add_argument("action", choices=["embed", "decode"])
+    parser.add_argument("images", nargs="+", help="covers to embed into, or stego images to decode (any order)")
+    parser.add_argument("--message", help="message to embed")
+    parser.add_argument("--message-file", help="read the message from this UTF-8 file")
+    parser.add_argument("--recipient", help="recipient email")
+    parser.add_argument("--out-dir", help="where stego images go (default: next to each cover)")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT)
+    parser.add_argument("--bits", type=int, default=1, choices=range(1, 5), help="LSBs per channel")
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: CPU cores)")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--show-message", action="store_true",
+                        help="also print the decoded message (by default only the recipient is shown)")
+    args = parser.parse_args(argv)
+    if args.action == "embed" and ((args.message is None) == (args.message_file is None) or not args.recipient):
+        parser.error("embedding needs --recipient and one of --message / --message-file")
+    try:
+        return _run(args)
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+def _run(args) -> int:
+    start = time.perf_counter()
+    if args.action == "decode":
+        result = decode_shards(args.images, workers=args.workers)
+        seconds = time.perf_counter() - start
+        if args.json:
+            line = dict(result, seconds=round(seconds, 4))
+            if not args.show_message:
+                del line["message"]
+            print(json.dumps(line, ensure_ascii=False))
+        else:
+            print(f"recipient={result['email']} ({len(result['message'])} chars, {seconds:.2f}s)")
+            if args.show_message:
+                print(result["message"])
+        return 0
+
+    message = args.message
+    if args.message_file:
+        with open(args.message_file, encoding="utf-8") as f:
+            message = f.read()
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    outputs = default_shard_paths(args.images, args.out_dir, args.format)
+    result = embed_shards(args.images, outputs, message, args.recipient, bits_per_channel=args.bits,
+                          output_format=args.format, workers=args.workers)
+    result["outputs"] = outputs
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for output, size in zip(outputs, result["chunk_bytes"]):
+            print(f"{output} ({size} bytes)")
+        print(f"{result['shards']} parts, message id {result['message_id']}, {result['seconds']:.2f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
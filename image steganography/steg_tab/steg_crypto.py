@@ -1,101 +1,389 @@
 # steg_tab/steg_crypto.py
-# LSB steganography with JSON payload { "email": ..., "message": ... }
+# LSB steganography carrying {"email": ..., "message": ...} in a compact container
+# (see payload_format.py); legacy JSON payloads are still decoded.
 
 from PIL import Image
+import numpy as np
 import math
-import json
+import os
+import threading
 
-def _int_to_bits(value: int, length: int):
-    return [(value >> i) & 1 for i in range(length-1, -1, -1)]
+from instrumentation import span
 
-def _bits_to_int(bits):
-    value = 0
-    for b in bits:
-        value = (value << 1) | (1 if b else 0)
-    return value
+from . import png_strips
+from .output_formats import DEFAULT_OUTPUT_FORMAT, get_output_format
+from .payload_format import pack_payload, unpack_payload, plausible_preamble, embedding_mode
 
-def embed_secret_message(input_image_path: str, output_image_path: str, secret_message: str, recipient_email: str) -> None:
+HEADER_BITS = 32  # big-endian payload length (bytes)
+RGB_CHANNELS = 3
+# length + payload lead byte + flags byte; always 1 LSB in R,G,B so the decoder can read
+# the embedding mode before touching the body
+PREAMBLE_BITS = HEADER_BITS + 16
+PREAMBLE_PIXELS = PREAMBLE_BITS // RGB_CHANNELS
+STRIP_ROWS = 256  # rows per strip in streaming mode
+
+# (bits_per_channel, use_alpha), cheapest first
+EMBEDDING_MODES = [(k, alpha) for k in range(1, 5) for alpha in (False, True)]
+
+def _channels(use_alpha: bool) -> int:
+    return 4 if use_alpha else RGB_CHANNELS
+
+def capacity_bits(num_pixels: int, bits_per_channel: int = 1, use_alpha: bool = False) -> int:
+    """Total bits (length header included) an image of num_pixels can hold in the given mode."""
+    if num_pixels <= PREAMBLE_PIXELS:
+        return num_pixels * RGB_CHANNELS
+    return PREAMBLE_BITS + (num_pixels - PREAMBLE_PIXELS) * _channels(use_alpha) * bits_per_channel
+
+def _pixels_for_bits(total_bits: int, bits_per_channel: int = 1, use_alpha: bool = False) -> int:
+    if total_bits <= PREAMBLE_BITS:
+        return math.ceil(total_bits / RGB_CHANNELS)
+    values = math.ceil((total_bits - PREAMBLE_BITS) / bits_per_channel)
+    return PREAMBLE_PIXELS + math.ceil(values / _channels(use_alpha))
+
+def _payload_to_bits(payload_bytes: bytes) -> np.ndarray:
+    """Header + payload as a flat uint8 array of 0/1 values, MSB first."""
+    with span("steg.bit_pack", bytes=len(payload_bytes)):
+        framed = len(payload_bytes).to_bytes(HEADER_BITS // 8, "big") + payload_bytes
+        return np.unpackbits(np.frombuffer(framed, dtype=np.uint8))
+
+def _embed_bits(pixels: np.ndarray, bits: np.ndarray, channels: int = RGB_CHANNELS, bits_per_channel: int = 1) -> None:
     """
-    Embeds JSON payload {"email": recipient_email, "message": secret_message} into input image and saves as output_image_path.
-    Raises ValueError if capacity insufficient.
+    Write bits into the low bits of the first `channels` channels of an (N, 4) uint8 pixel array, in place.
+    Each channel takes bits_per_channel bits (MSB first), filling R, G, B(, A) of pixel 0, then pixel 1,
+    and so on; a short final group is zero-padded. Later pixels are not touched.
+    """
+    total_bits = bits.size
+    if not total_bits:
+        return
+    n_values = math.ceil(total_bits / bits_per_channel)
+    used_pixels = math.ceil(n_values / channels)
+    region = pixels[:used_pixels, :channels]
+    flat = region.reshape(-1)  # copy of just the touched channel bytes
+    if bits_per_channel == 1:
+        values = bits
+    else:
+        padded = np.zeros(n_values * bits_per_channel, dtype=np.uint8)
+        padded[:total_bits] = bits
+        shifts = np.arange(bits_per_channel - 1, -1, -1, dtype=np.uint8)
+        values = (padded.reshape(-1, bits_per_channel) << shifts).sum(axis=1, dtype=np.uint8)
+    keep = 0xFF ^ ((1 << bits_per_channel) - 1)
+    flat[:n_values] = (flat[:n_values] & keep) | values
+    region[...] = flat.reshape(region.shape)
+
+def _extract_bits(pixels: np.ndarray, total_bits: int, channels: int = RGB_CHANNELS, bits_per_channel: int = 1) -> np.ndarray:
+    """Read total_bits bits written by _embed_bits with the same channels/bits_per_channel."""
+    n_values = math.ceil(total_bits / bits_per_channel)
+    used_pixels = math.ceil(n_values / channels)
+    values = pixels[:used_pixels, :channels].reshape(-1)[:n_values]
+    if bits_per_channel == 1:
+        return values & 1
+    shifts = np.arange(bits_per_channel - 1, -1, -1, dtype=np.uint8)
+    return ((values[:, None] >> shifts) & 1).reshape(-1)[:total_bits]
+
+def _segments(bits: np.ndarray, bits_per_channel: int, use_alpha: bool):
+    """Split the framed bit stream into (first_pixel, bits, channels, bits_per_channel) runs."""
+    return [(0, bits[:PREAMBLE_BITS], RGB_CHANNELS, 1),
+            (PREAMBLE_PIXELS, bits[PREAMBLE_BITS:], _channels(use_alpha), bits_per_channel)]
+
+def _embed_segments(pixels: np.ndarray, pixel_offset: int, segments) -> None:
+    """Write the parts of each segment that fall inside pixels, which starts at image pixel pixel_offset."""
+    with span("steg.pixel_walk"):
+        for first_pixel, bits, channels, bits_per_channel in segments:
+            per_pixel = channels * bits_per_channel
+            start = max(pixel_offset, first_pixel)
+            stop = min(pixel_offset + len(pixels), first_pixel + math.ceil(bits.size / per_pixel))
+            if start >= stop:
+                continue
+            seg_bits = bits[(start - first_pixel) * per_pixel:(stop - first_pixel) * per_pixel]
+            _embed_bits(pixels[start - pixel_offset:stop - pixel_offset], seg_bits, channels, bits_per_channel)
+
+def _extract_stream(pixels: np.ndarray, total_bits: int, bits_per_channel: int, use_alpha: bool) -> np.ndarray:
+    with span("steg.pixel_walk", bits=total_bits):
+        head = _extract_bits(pixels, min(total_bits, PREAMBLE_BITS))
+        if total_bits <= PREAMBLE_BITS:
+            return head
+        body = _extract_bits(pixels[PREAMBLE_PIXELS:], total_bits - PREAMBLE_BITS,
+                             _channels(use_alpha), bits_per_channel)
+        return np.concatenate([head, body])
+
+def _bits_to_bytes(bits: np.ndarray) -> bytes:
+    with span("steg.bit_pack", bits=bits.size):
+        return np.packbits(bits).tobytes()
+
+def _load_rgba(image_path: str):
+    """Open an image as a writable (N, 4) uint8 RGBA pixel array, returned with its size."""
+    with span("image.open"):
+        img = Image.open(image_path)
+    with span("image.convert_rgba", pixels=img.width * img.height):
+        img = img.convert("RGBA")
+        return np.array(img, dtype=np.uint8).reshape(-1, 4), img.size
+
+def _read_rgba_rows(image_path: str, rows: int) -> np.ndarray:
+    """
+    Decode only the first `rows` rows of an image as an (N, 4) RGBA pixel array.
+    8-bit non-interlaced PNGs are inflated only as far as those rows; other formats are
+    decoded in full and cropped.
     """
+    with span("image.open"):
+        img = Image.open(image_path)
+    with img:
+        width, height = img.size
+        rows = min(rows, height)
+        if rows < height and png_strips.is_streamable(img):
+            strips = png_strips.iter_strips(img, image_path, rows)
+            try:
+                strip = next(strips)
+            finally:
+                strips.close()
+        else:
+            strip = img.crop((0, 0, width, rows))
+        with span("image.convert_rgba", pixels=width * rows):
+            return np.array(strip.convert("RGBA"), dtype=np.uint8).reshape(-1, 4)
+
+def _build_payload(secret_message: str, recipient_email: str, compress: bool = True,
+                   bits_per_channel: int = 1, use_alpha: bool = False) -> bytes:
     if secret_message is None:
         raise ValueError("secret_message is None")
     if recipient_email is None:
         raise ValueError("recipient_email is None")
 
-    payload = {"email": recipient_email, "message": secret_message}
-    payload_bytes = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with span("payload.pack", compress=compress):
+        return pack_payload(recipient_email, secret_message, compress, bits_per_channel, use_alpha)
 
-    img = Image.open(input_image_path)
-    img = img.convert("RGBA")
-    pixels = list(img.getdata())
-    num_pixels = len(pixels)
+def _check_capacity(total_bits: int, num_pixels: int, bits_per_channel: int, use_alpha: bool) -> None:
+    capacity = capacity_bits(num_pixels, bits_per_channel, use_alpha)
+    if total_bits > capacity:
+        raise ValueError(f"Image too small. Need {total_bits} bits but capacity is {capacity} bits.")
 
-    # header: 32-bit length (bytes)
-    payload_length = len(payload_bytes)
-    header_bits = _int_to_bits(payload_length, 32)
+def _has_alpha(img) -> bool:
+    return "A" in img.getbands() or "transparency" in img.info
 
-    message_bits = []
-    for b in payload_bytes:
-        message_bits.extend(_int_to_bits(b, 8))
-    bits = header_bits + message_bits
-    total_bits = len(bits)
+def _output_format(output_format, use_alpha: bool):
+    fmt = get_output_format(output_format)
+    if use_alpha and not fmt.alpha:
+        raise ValueError(f"{fmt.name} output cannot carry the alpha channel; choose another format.")
+    return fmt
 
-    capacity = num_pixels * 3  # R,G,B LSBs
-    if total_bits > capacity:
-        raise ValueError(f"Image too small. Need {total_bits} bits but capacity is {capacity} bits.")
+def _save_rgba(pixels: np.ndarray, size, output_image_path: str, output_format) -> None:
+    with span("image.encode", format=output_format.name, pixels=len(pixels)):
+        out_img = Image.fromarray(pixels.reshape(size[1], size[0], 4), "RGBA")
+        if not output_format.alpha:
+            out_img = out_img.convert("RGB")
+        out_img.save(output_image_path, format=output_format.format, **output_format.options)
 
-    new_pixels = []
-    bit_idx = 0
-    for (r, g, b, a) in pixels:
-        r_new, g_new, b_new = r, g, b
-        if bit_idx < total_bits:
-            r_new = (r & ~1) | bits[bit_idx]; bit_idx += 1
-        if bit_idx < total_bits:
-            g_new = (g & ~1) | bits[bit_idx]; bit_idx += 1
-        if bit_idx < total_bits:
-            b_new = (b & ~1) | bits[bit_idx]; bit_idx += 1
-        new_pixels.append((r_new, g_new, b_new, a))
-
-    out_img = Image.new("RGBA", img.size)
-    out_img.putdata(new_pixels)
-    out_img.save(output_image_path, format="PNG")  # PNG to preserve LSBs
-
-def decode_secret_payload(stego_image_path: str) -> dict:
-    """
-    Extract payload bytes and return parsed JSON dict {"email":..., "message":...}.
-    This returns the payload without any OTP gating; caller should validate before revealing message.
+class _WholeImageWriter:
+    """Strip-writer interface for formats PIL can only encode whole; holds the full image."""
+    def __init__(self, path: str, width: int, height: int, output_format):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.output_format = output_format
+        self.rows_written = 0
+        self._pixels = np.empty((width * height, 4), dtype=np.uint8)
+
+    def write(self, rows: np.ndarray) -> None:
+        rows = rows.reshape(-1, 4)
+        start = self.rows_written * self.width
+        self._pixels[start:start + len(rows)] = rows
+        self.rows_written += len(rows) // self.width
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            if self.rows_written != self.height:
+                raise ValueError(f"Wrote {self.rows_written} of {self.height} rows.")
+            _save_rgba(self._pixels, (self.width, self.height), self.path, self.output_format)
+
+def _strip_writer(path: str, width: int, height: int, output_format):
+    if output_format.format == "PNG":
+        return png_strips.RGBAStripWriter(path, width, height, output_format.options.get("compress_level", 6))
+    return _WholeImageWriter(path, width, height, output_format)
+
+def plan_capacity(image_path: str, payload: bytes, output_format=DEFAULT_OUTPUT_FORMAT) -> dict:
+    """
+    Check whether payload (as built by pack_payload) fits in an image, using only the image's
+    dimensions and mode -- no pixel data is decoded.
+    Returns {"fits", "payload_bits", "bits_per_channel", "use_alpha", "capacity_bits", "modes"}, where
+    the mode fields name the cheapest fitting mode (fewest LSBs per channel, alpha only when the
+    image already has transparency and output_format keeps it) and "modes" lists
+    (bits_per_channel, use_alpha, capacity_bits) for every mode considered.
     """
-    img = Image.open(stego_image_path)
-    img = img.convert("RGBA")
-    pixels = list(img.getdata())
+    with Image.open(image_path) as img:
+        num_pixels = img.width * img.height
+        alpha_ok = _has_alpha(img) and get_output_format(output_format).alpha
+    payload_bits = HEADER_BITS + len(payload) * 8
+    modes = [(k, alpha, capacity_bits(num_pixels, k, alpha))
+             for k, alpha in EMBEDDING_MODES if alpha_ok or not alpha]
+    fitting = [m for m in modes if m[2] >= payload_bits]
+    k, alpha, capacity = fitting[0] if fitting else modes[-1]
+    return {"fits": bool(fitting), "payload_bits": payload_bits, "bits_per_channel": k,
+            "use_alpha": alpha, "capacity_bits": capacity, "modes": modes}
 
-    bits = []
-    for (r, g, b, a) in pixels:
-        bits.append(r & 1)
-        bits.append(g & 1)
-        bits.append(b & 1)
+def _iter_rgba_strips(img, image_path: str, strip_rows: int):
+    """Yield (n_rows * width, 4) RGBA strips; streamable PNGs are never fully decoded."""
+    if png_strips.is_streamable(img):
+        strips = png_strips.iter_strips(img, image_path, strip_rows)
+    else:
+        strips = (img.crop((0, top, img.width, min(top + strip_rows, img.height)))
+                  for top in range(0, img.height, strip_rows))
+    strips = iter(strips)
+    while True:
+        with span("image.read_strip"):  # closed before the yield, so spans never straddle it
+            strip = next(strips, None)
+            if strip is None:
+                return
+            pixels = np.array(strip.convert("RGBA"), dtype=np.uint8).reshape(-1, 4)
+        yield pixels
 
-    if len(bits) < 32:
+def embed_secret_message(input_image_path: str, output_image_path: str, secret_message: str, recipient_email: str,
+                         compress: bool = True, bits_per_channel: int = 1, use_alpha: bool = False,
+                         progress=None, output_format=DEFAULT_OUTPUT_FORMAT) -> None:
+    """
+    Embeds payload {"email": recipient_email, "message": secret_message} into input image and saves as output_image_path.
+    The payload is compressed when that makes it smaller, unless compress is False.
+    bits_per_channel (1-4) and use_alpha select the embedding mode; it is recorded in the payload flags.
+    output_format names a lossless format from output_formats.py (png, png-fast, webp, tiff, ...).
+    progress(done, total) is called after each stage (load, embed, save); it may raise to abort.
+    Raises ValueError if capacity insufficient.
+    """
+    payload_bytes = _build_payload(secret_message, recipient_email, compress, bits_per_channel, use_alpha)
+    embed_payload(input_image_path, output_image_path, payload_bytes, bits_per_channel, use_alpha,
+                  progress, output_format)
+
+def embed_payload(input_image_path: str, output_image_path: str, payload_bytes: bytes, bits_per_channel: int = 1,
+                  use_alpha: bool = False, progress=None, output_format=DEFAULT_OUTPUT_FORMAT) -> None:
+    """
+    embed_secret_message for a ready-made container (pack_payload or pack_shard); its flags
+    must record the same bits_per_channel/use_alpha.
+    """
+    output_format = _output_format(output_format, use_alpha)
+    bits = _payload_to_bits(payload_bytes)
+
+    with Image.open(input_image_path) as img:
+        _check_capacity(bits.size, img.width * img.height, bits_per_channel, use_alpha)
+
+    pixels, size = _load_rgba(input_image_path)
+    if progress:
+        progress(1, 3)
+    _embed_segments(pixels, 0, _segments(bits, bits_per_channel, use_alpha))
+    if progress:
+        progress(2, 3)
+
+    _save_rgba(pixels, size, output_image_path, output_format)
+    if progress:
+        progress(3, 3)
+
+def embed_secret_message_streaming(input_image_path: str, output_image_path: str, secret_message: str,
+                                   recipient_email: str, strip_rows: int = STRIP_ROWS, compress: bool = True,
+                                   bits_per_channel: int = 1, use_alpha: bool = False, progress=None,
+                                   output_format=DEFAULT_OUTPUT_FORMAT) -> None:
+    """
+    Same output as embed_secret_message, but the cover is processed in horizontal strips of
+    strip_rows rows, so peak memory follows the strip size rather than the image size.
+    Rows past the payload region are converted and written out without any LSB work.
+    Memory stays bounded only for 8-bit non-interlaced PNG covers saved as PNG: JPEG, TIFF,
+    WebP and BMP covers are decoded whole on the first strip, and other output formats are
+    encoded whole at the end.
+    The output is written to a temporary file next to output_image_path and moved into place
+    only on success, so a failed or aborted embed leaves any existing file untouched.
+    progress(rows_done, height) is called after each strip; it may raise to abort.
+    """
+    payload_bytes = _build_payload(secret_message, recipient_email, compress, bits_per_channel, use_alpha)
+    embed_payload_streaming(input_image_path, output_image_path, payload_bytes, strip_rows, bits_per_channel,
+                            use_alpha, progress, output_format)
+
+def embed_payload_streaming(input_image_path: str, output_image_path: str, payload_bytes: bytes,
+                            strip_rows: int = STRIP_ROWS, bits_per_channel: int = 1, use_alpha: bool = False,
+                            progress=None, output_format=DEFAULT_OUTPUT_FORMAT) -> None:
+    """embed_secret_message_streaming for a ready-made container, as in embed_payload."""
+    output_format = _output_format(output_format, use_alpha)
+    bits = _payload_to_bits(payload_bytes)
+    segments = _segments(bits, bits_per_channel, use_alpha)
+    used_pixels = _pixels_for_bits(bits.size, bits_per_channel, use_alpha)
+
+    with Image.open(input_image_path) as img:
+        width, height = img.size
+        _check_capacity(bits.size, width * height, bits_per_channel, use_alpha)
+
+        tmp = f"{output_image_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with _strip_writer(tmp, width, height, output_format) as writer:
+                pixel_offset = 0
+                for pixels in _iter_rgba_strips(img, input_image_path, strip_rows):
+                    if pixel_offset < used_pixels:
+                        _embed_segments(pixels, pixel_offset, segments)
+                    pixel_offset += len(pixels)
+                    with span("image.encode_strip", rows=len(pixels) // width):
+                        writer.write(pixels)
+                    if progress:
+                        progress(writer.rows_written, height)
+            os.replace(tmp, output_image_path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+def read_payload_header(stego_image_path: str) -> dict:
+    """
+    Read and check only the preamble pixels (the first 16, usually part of one row):
+    {"length", "lead", "flags", "bits_per_channel", "use_alpha", "width", "height"}.
+    Raises ValueError when the image cannot hold a payload, which is the case for almost
+    every ordinary image.
+    """
+    with Image.open(stego_image_path) as img:
+        width, height = img.size
+    num_pixels = width * height
+
+    if num_pixels < PREAMBLE_PIXELS:
         raise ValueError("Image too small or contains no payload header.")
 
-    header_bits = bits[:32]
-    payload_length = _bits_to_int(header_bits)
-    required_bits = payload_length * 8
-    if 32 + required_bits > len(bits):
+    header_pixels = _read_rgba_rows(stego_image_path, math.ceil(PREAMBLE_PIXELS / width))
+    preamble = _bits_to_bytes(_extract_bits(header_pixels, PREAMBLE_BITS))
+    payload_length = int.from_bytes(preamble[:4], "big")
+    if not plausible_preamble(payload_length, preamble[4], preamble[5]):
+        raise ValueError("No payload found in image.")
+    bits_per_channel, use_alpha = embedding_mode(preamble[4], preamble[5])
+    if HEADER_BITS + payload_length * 8 > capacity_bits(num_pixels, bits_per_channel, use_alpha):
         raise ValueError("Image does not contain the full payload (truncated).")
+    return {"length": payload_length, "lead": preamble[4], "flags": preamble[5],
+            "bits_per_channel": bits_per_channel, "use_alpha": use_alpha, "width": width, "height": height}
 
-    payload_bits = bits[32:32 + required_bits]
-    payload_bytes = bytearray()
-    for i in range(0, len(payload_bits), 8):
-        byte_bits = payload_bits[i:i+8]
-        b = _bits_to_int(byte_bits)
-        payload_bytes.append(b)
+def extract_payload_bytes(stego_image_path: str, progress=None) -> bytes:
+    """
+    Extract the raw payload bytes, reading only the rows that hold them.
+    The preamble (32-bit length, lead byte, flags) is checked by read_payload_header before
+    any payload rows are decoded, so non-stego images are rejected early. progress(done, total)
+    is called after the header and the payload rows are read.
+    """
+    header = read_payload_header(stego_image_path)
+    bits_per_channel, use_alpha, width = header["bits_per_channel"], header["use_alpha"], header["width"]
+    if progress:
+        progress(1, 2)
+
+    total_bits = HEADER_BITS + header["length"] * 8
+    used_pixels = _pixels_for_bits(total_bits, bits_per_channel, use_alpha)
+    pixels = _read_rgba_rows(stego_image_path, math.ceil(used_pixels / width))
+    if progress:
+        progress(2, 2)
+    return _bits_to_bytes(_extract_stream(pixels, total_bits, bits_per_channel, use_alpha)[HEADER_BITS:])
+
+def parse_payload(payload_bytes: bytes) -> dict:
+    """Parse bytes from extract_payload_bytes into {"email":..., "message":...}."""
     try:
-        payload_text = payload_bytes.decode("utf-8")
-        payload = json.loads(payload_text)
+        with span("payload.parse", bytes=len(payload_bytes)):
+            payload = unpack_payload(payload_bytes)
         # expect payload to be dict with 'email' and 'message'
         return payload
     except Exception as e:
-        raise ValueError(f"Failed to parse payload JSON: {e}")
+        raise ValueError(f"Failed to parse payload: {e}")
+
+def decode_secret_payload(stego_image_path: str, progress=None) -> dict:
+    """
+    Extract payload bytes and return parsed dict {"email":..., "message":...}.
+    This returns the payload without any OTP gating; caller should validate before revealing message.
+    """
+    return parse_payload(extract_payload_bytes(stego_image_path, progress))